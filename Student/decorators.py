@@ -10,8 +10,11 @@ def student_required(view_func):
             return redirect('student:loginn')
         
         try:
-            from core.models import Profile
-            profile, _ = Profile.objects.get_or_create(user=request.user, defaults={'is_admin': request.user.is_staff})
+            profile = request.profile
+            if profile is None:
+                from core.models import Profile
+                profile, _ = Profile.objects.get_or_create(user=request.user, defaults={'is_admin': request.user.is_staff})
+                request.profile, request.department = profile, profile.department
             # Student: not admin, not staff, not superuser
             if profile.is_admin or request.user.is_staff or request.user.is_superuser:
                 messages.error(request, 'Access denied. This page is for students only.')
@@ -35,7 +38,7 @@ def dept_admin_required(view_func):
         
         try:
             # Check if user is a department admin using is_admin flag
-            if not (request.user.is_superuser or request.user.is_staff or (hasattr(request.user, 'profile') and request.user.profile.is_admin)):
+            if not (request.user.is_superuser or request.user.is_staff or (request.profile and request.profile.is_admin)):
                 messages.error(request, 'Access denied. This page is for department administrators only.')
                 logout(request)
                 request.session.flush()
@@ -56,11 +59,11 @@ def superuser_required(view_func):
             return redirect('core:login')
         
         try:
-            if request.user.profile.role != 'superuser':
+            if request.profile.role != 'superuser':
                 messages.error(request, 'Access denied. This page is for superusers only.')
-                if request.user.profile.role == 'student':
+                if request.profile.role == 'student':
                     return redirect('student:landingpage')
-                elif request.user.profile.role == 'dept_admin':
+                elif request.profile.role == 'dept_admin':
                     return redirect('dept_admin:dashboard')
                 return redirect('core:login')
         except:
@@ -1,9 +1,10 @@
 from django import forms
-from django.db.models import Min
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
+from django.conf import settings
 from core.models import Department
 from .models import Ticket, PRIORITY_CHOICES
+from .lookups import departments
 import os
 
 class StudentRegistrationForm(UserCreationForm):
@@ -142,13 +143,13 @@ class ComplaintForm(forms.ModelForm):
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        # Get unique departments by using subquery to get the first ID for each name
-        unique_dept_ids = Department.objects.values('name').annotate(
-            min_id=Min('id')
-        ).values_list('min_id', flat=True)
-        self.fields['department'].queryset = Department.objects.filter(
-            id__in=unique_dept_ids
-        ).order_by('name')
+        # Options come from the department cache; the queryset is only
+        # queried to validate a submitted choice
+        field = self.fields['department']
+        field.queryset = Department.objects.order_by('name')
+        field.choices = [('', field.empty_label)] + [
+            (department.pk, department.name) for department in departments()
+        ]
     
     class Meta:
         model = Ticket
@@ -180,7 +181,7 @@ class ComplaintForm(forms.ModelForm):
         attachment = self.cleaned_data.get('attachment')
         if attachment:
             # Check file size (5MB limit)
-            if attachment.size > 5 * 1024 * 1024:  # 5MB in bytes
+            if attachment.size > settings.MAX_UPLOAD_SIZE:
                 raise forms.ValidationError("File size must be under 5MB")
             
             # Check file extension
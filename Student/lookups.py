@@ -0,0 +1,108 @@
+"""
+Process-local cache of departments and SLA configurations.
+
+Both tables are tiny and rarely change, so they are loaded in full on first
+use and kept in memory. Every change bumps the ``LookupVersion`` row in the
+same transaction; each process re-reads that stamp at most once every
+``LOOKUP_CACHE_CHECK_SECONDS`` and reloads when it moved, so gunicorn
+workers and the background commands pick up an edit made in any of them.
+
+Cached instances are shared between requests and must be treated as
+read-only; fetch a fresh row from the database before modifying one.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from core.models import Department
+from .models import LookupVersion, SLAConfig
+
+CHECK_INTERVAL = getattr(settings, 'LOOKUP_CACHE_CHECK_SECONDS', 5)
+
+_lock = threading.Lock()
+_lookups = None
+
+
+class _Lookups:
+    def __init__(self, version):
+        self.version = version
+        self.checked_at = time.monotonic()
+        self.departments = list(Department.objects.order_by('name', 'id'))
+        self.departments_by_id = {department.pk: department for department in self.departments}
+        self.departments_by_name = {department.name: department for department in self.departments}
+        self.sla_configs = {
+            (config.department_id, config.priority): config
+            for config in SLAConfig.objects.all()
+        }
+
+
+def _current_version():
+    return LookupVersion.objects.filter(pk=1).values_list('version', flat=True).first() or 0
+
+
+def _get_lookups():
+    global _lookups
+    lookups = _lookups
+    if lookups is not None and time.monotonic() - lookups.checked_at < CHECK_INTERVAL:
+        return lookups
+    # Read the stamp before the rows so a concurrent change is never cached
+    # under its new version
+    version = _current_version()
+    with _lock:
+        lookups = _lookups
+        if lookups is None or lookups.version != version:
+            lookups = _lookups = _Lookups(version)
+        else:
+            lookups.checked_at = time.monotonic()
+    return lookups
+
+
+def _clear():
+    global _lookups
+    _lookups = None
+
+
+def _bump_version():
+    if not LookupVersion.objects.filter(pk=1).update(version=F('version') + 1):
+        LookupVersion.objects.get_or_create(pk=1, defaults={'version': 1})
+
+
+def invalidate():
+    """
+    Bump the shared version with the current transaction and drop the
+    cached lookups now and again once it commits, so a concurrent reload
+    cannot keep pre-commit rows.
+    """
+    _clear()
+    _bump_version()
+    transaction.on_commit(_clear)
+
+
+def departments():
+    """All departments, ordered by name."""
+    return list(_get_lookups().departments)
+
+
+def get_department(pk):
+    return _get_lookups().departments_by_id.get(pk)
+
+
+def get_department_by_name(name):
+    return _get_lookups().departments_by_name.get(name)
+
+
+def get_general_department():
+    """The General department escalated tickets move to, created if missing."""
+    department = get_department_by_name('General')
+    if department is None:
+        # 24-hour SLA for escalated tickets; the post_save signal resets the cache
+        department, _ = Department.objects.get_or_create(name='General', defaults={'sla_hours': 24})
+    return department
+
+
+def get_sla_config(department_id, priority):
+    """The SLAConfig for a department and priority, or None."""
+    return _get_lookups().sla_configs.get((department_id, priority))
@@ -1,8 +1,13 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from Student.models import Ticket, SLABreachLog
-from core.utils import send_student_email_via_brevo_api
-from django.conf import settings
+from Student.models import Ticket
+from Student.sla import (
+    find_breached_ticket_ids,
+    find_escalatable_ticket_ids,
+    in_batches,
+    record_breaches,
+    notify_breaches,
+)
 from django.contrib.auth.models import User
 
 class Command(BaseCommand):
@@ -17,77 +22,41 @@ class Command(BaseCommand):
             )
             return
 
-        # Get all open tickets
-        open_tickets = Ticket.objects.filter(
-            status__in=['open', 'in_progress', 'on_hold']
-        )
+        now = timezone.now()
 
-        for ticket in open_tickets:
-            # Check for SLA breach
-            if ticket.is_sla_breached and not ticket.sla_breach:
-                # Create SLA breach log
-                breach_type = 'response' if not ticket.first_response_at else 'resolution'
-                breach_log = SLABreachLog.objects.create(
-                    ticket=ticket,
-                    breach_type=breach_type
-                )
+        # Deadlines are computed in SQL, so only breached/escalatable
+        # tickets are ever loaded into Python.
+        breaches = find_breached_ticket_ids(now)
+        escalatable_ids = find_escalatable_ticket_ids(now)
 
-                # Update ticket status
-                ticket.sla_breach = True
-                ticket.save()
+        breach_logs = record_breaches(breaches, now)
+        self.stdout.write(f'Recorded {len(breach_logs)} new SLA breaches')
 
-                # Send notification email
-                subject = f'SLA Breach Alert - Ticket {ticket.ticket_id}'
-                message = f'''
-                SLA breach detected for ticket {ticket.ticket_id}
-                Department: {ticket.department}
-                Priority: {ticket.priority}
-                Created: {ticket.created_at}
-                Breach Type: {breach_type}
-                
-                Please take immediate action.
-                '''
-                # Send to department head
-                try:
-                    send_student_email_via_brevo_api(
-                        subject=subject,
-                        message=message,
-                        recipient_email=f"{ticket.department.name.lower()}@apollouniversity.edu"
-                    )
-                    breach_log.notified = True
-                    breach_log.save()
-                except Exception as e:
-                    self.stdout.write(
-                        self.style.ERROR(f'Failed to send notification for ticket {ticket.ticket_id}: {str(e)}')
-                    )
+        # Department inboxes get one digest per window instead of an email per breach
+        notify_breaches(breach_logs)
 
-            # Check for escalation
-            if ticket.should_escalate() and ticket.status != 'escalated':
-                try:
-                    ticket.escalate(
-                        system_user,
-                        reason="Automatic escalation due to SLA breach"
-                    )
-                    # Send escalation notification using the improved function
-                    from core.utils import send_escalation_notification_to_admins
-                    try:
-                        send_escalation_notification_to_admins(ticket, system_user, "Automatic escalation due to SLA breach")
-                        self.stdout.write(
-                            self.style.SUCCESS(f'Successfully sent escalation notifications for ticket {ticket.ticket_id}')
-                        )
-                    except Exception as e:
-                        self.stdout.write(
-                            self.style.ERROR(f'Failed to send escalation notifications for ticket {ticket.ticket_id}: {str(e)}')
-                        )
-                    self.stdout.write(
-                        self.style.SUCCESS(f'Successfully escalated ticket {ticket.ticket_id}')
-                    )
-                except Exception as e:
-                    self.stdout.write(
-                        self.style.ERROR(f'Failed to escalate ticket {ticket.ticket_id}: {str(e)}')
-                    )
+        for batch in in_batches(escalatable_ids):
+            escalatable = Ticket.objects.filter(id__in=batch).select_related(
+                'student', 'department'
+            )
+            for ticket in escalatable:
+                self._escalate(ticket, system_user)
 
         self.stdout.write(
             self.style.SUCCESS('Successfully checked SLA breaches and escalations')
         )
 
+    def _escalate(self, ticket, system_user):
+        # escalate() claims the ticket atomically and sends the notifications,
+        # so a ticket escalated concurrently elsewhere is simply skipped
+        try:
+            if ticket.escalate(system_user, reason="Automatic escalation due to SLA breach"):
+                self.stdout.write(
+                    self.style.SUCCESS(f'Successfully escalated ticket {ticket.ticket_id}')
+                )
+            else:
+                self.stdout.write(f'Ticket {ticket.ticket_id} was already escalated')
+        except Exception as e:
+            self.stdout.write(
+                self.style.ERROR(f'Failed to escalate ticket {ticket.ticket_id}: {str(e)}')
+            )
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from Student.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Reindex every ticket in the full-text search index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Number of tickets reindexed per batch')
+
+    def handle(self, *args, **options):
+        count = rebuild_search_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} tickets'))
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from Student.rollup import refresh_daily_sla_stats
+
+
+class Command(BaseCommand):
+    help = 'Update the daily SLA rollup used by the SLA dashboards from tickets changed since the last run'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Rebuild the whole rollup instead of only the days changed since the last run')
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep running and refresh the rollup every --interval seconds')
+        parser.add_argument('--interval', type=float, default=60,
+                            help='Seconds to sleep between refreshes (with --loop)')
+
+    def handle(self, *args, **options):
+        full = options['full']
+        while True:
+            days, rows = refresh_daily_sla_stats(full=full)
+            self.stdout.write(self.style.SUCCESS(f'Recomputed {days} days ({rows} rollup rows)'))
+            if not options['loop']:
+                break
+            # Only the first pass of a looping worker rebuilds everything
+            full = False
+            time.sleep(options['interval'])
+            close_old_connections()
@@ -0,0 +1,38 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from Student.watcher import SLAWatcher
+
+
+class Command(BaseCommand):
+    help = ('Watch SLA deadlines continuously, recording breaches and escalating tickets '
+            'as soon as they fall due (replaces running check_sla from cron)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--refresh-interval', type=float, default=30,
+                            help='Maximum seconds between checks for new or changed tickets')
+        parser.add_argument('--once', action='store_true',
+                            help='Run a single load-and-fire cycle and exit')
+
+    def handle(self, *args, **options):
+        system_user = User.objects.filter(is_superuser=True).first()
+        if not system_user:
+            self.stdout.write(self.style.ERROR('No superuser found for automatic escalations'))
+            return
+
+        watcher = SLAWatcher(system_user)
+        self.stdout.write(f'Watching {watcher.load()} open tickets')
+
+        while True:
+            breaches, escalations = watcher.fire_due()
+            if breaches or escalations:
+                self.stdout.write(f'Recorded {breaches} breaches, escalated {escalations} tickets')
+            if options['once']:
+                break
+
+            time.sleep(watcher.seconds_until_next(options['refresh_interval']))
+            close_old_connections()
+            watcher.refresh()
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:40
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_sla_deadlines(apps, schema_editor):
+    Ticket = apps.get_model('Student', 'Ticket')
+    SLAConfig = apps.get_model('Student', 'SLAConfig')
+    for config in SLAConfig.objects.all():
+        Ticket.objects.filter(
+            department_id=config.department_id,
+            priority=config.priority,
+        ).update(
+            response_due_at=models.F('created_at') + timedelta(hours=config.response_time_hours),
+            resolution_due_at=models.F('created_at') + timedelta(hours=config.resolution_time_hours),
+            escalation_due_at=models.F('created_at') + timedelta(hours=config.escalation_time_hours),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Student', '0013_alter_slaconfig_options_alter_ticket_options_and_more'),
+        ('core', '0011_profile_phone_number'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='escalation_due_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='resolution_due_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='response_due_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['status', 'escalation_due_at'], name='Student_tic_status_a182d1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['status', 'resolution_due_at'], name='Student_tic_status_f2fb9c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['status', 'response_due_at'], name='Student_tic_status_79b3a6_idx'),
+        ),
+        migrations.RunPython(backfill_sla_deadlines, migrations.RunPython.noop),
+    ]
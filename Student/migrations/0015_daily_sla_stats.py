@@ -0,0 +1,42 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:52
+
+import datetime
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Student', '0014_ticket_sla_due_dates'),
+        ('core', '0012_outboundemail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailySLAStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('priority', models.CharField(choices=[('low', 'Low'), ('medium', 'Medium'), ('high', 'High'), ('urgent', 'Urgent')], max_length=10)),
+                ('created_count', models.PositiveIntegerField(default=0)),
+                ('resolved_count', models.PositiveIntegerField(default=0)),
+                ('breached_count', models.PositiveIntegerField(default=0)),
+                ('resolution_time_total', models.DurationField(default=datetime.timedelta(0))),
+                ('department', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.department')),
+            ],
+            options={
+                'verbose_name': 'Daily SLA Statistics',
+                'verbose_name_plural': 'Daily SLA Statistics',
+                'unique_together': {('date', 'department', 'priority')},
+            },
+        ),
+    ]
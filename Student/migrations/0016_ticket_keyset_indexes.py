@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Student', '0015_daily_sla_stats'),
+        ('core', '0012_outboundemail'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['department', '-created_at', '-id'], name='Student_tic_departm_55feec_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['department', '-escalated_at', '-id'], name='Student_tic_departm_e98900_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['student', '-created_at', '-id'], name='Student_tic_student_c6cb57_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Student', '0016_ticket_keyset_indexes'),
+        ('core', '0012_outboundemail'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='slabreachlog',
+            index=models.Index(fields=['breached_at', 'ticket'], name='Student_sla_breache_23ff78_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['department', 'status'], name='Student_tic_departm_f44255_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['student', 'status'], name='Student_tic_student_68cefa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(condition=models.Q(('status__in', ['open', 'in_progress', 'on_hold'])), fields=['department', 'priority', '-created_at', '-id'], name='ticket_open_priority_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:12
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def remove_duplicate_breach_logs(apps, schema_editor):
+    # Keep the earliest log per (ticket, breach_type)
+    SLABreachLog = apps.get_model('Student', 'SLABreachLog')
+    keep = SLABreachLog.objects.values('ticket', 'breach_type').annotate(first_id=Min('id')).values('first_id')
+    SLABreachLog.objects.exclude(id__in=keep).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Student', '0017_ticket_access_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_breach_logs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='slabreachlog',
+            constraint=models.UniqueConstraint(fields=('ticket', 'breach_type'), name='unique_ticket_breach_type'),
+        ),
+    ]
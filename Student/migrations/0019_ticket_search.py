@@ -0,0 +1,57 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS ticket_search "
+            "USING fts5(subject, body, tokenize='porter unicode61')"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE TABLE IF NOT EXISTS ticket_search ('
+            'ticket_id bigint PRIMARY KEY REFERENCES "Student_ticket" (id) ON DELETE CASCADE, '
+            'document tsvector NOT NULL)'
+        )
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS ticket_search_document_idx ON ticket_search USING GIN (document)"
+        )
+    else:
+        return
+
+    # Backfill existing tickets
+    Ticket = apps.get_model('Student', 'Ticket')
+    TicketUpdate = apps.get_model('Student', 'TicketUpdate')
+    comments = {}
+    for ticket_id, comment in TicketUpdate.objects.order_by('id').values_list('ticket_id', 'comment'):
+        comments.setdefault(ticket_id, []).append(comment)
+    rows = [
+        (pk, subject, '\n'.join([description] + comments.get(pk, [])))
+        for pk, subject, description in Ticket.objects.values_list('id', 'subject', 'description').iterator()
+    ]
+    with schema_editor.connection.cursor() as cursor:
+        if vendor == 'sqlite':
+            cursor.executemany("INSERT INTO ticket_search (rowid, subject, body) VALUES (%s, %s, %s)", rows)
+        else:
+            cursor.executemany(
+                "INSERT INTO ticket_search (ticket_id, document) VALUES "
+                "(%s, setweight(to_tsvector('english', %s), 'A') || setweight(to_tsvector('english', %s), 'B'))",
+                rows,
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute("DROP TABLE IF EXISTS ticket_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Student', '0018_unique_breach_log'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:28
+
+import Student.models
+import core.storage
+import django.core.validators
+import os
+
+from django.db import migrations, models
+
+
+def fill_attachment_names(apps, schema_editor):
+    # Existing attachments keep their file names, which were the uploaded names
+    Ticket = apps.get_model('Student', 'Ticket')
+    tickets = Ticket.objects.exclude(attachment='').exclude(attachment__isnull=True)
+    for ticket in tickets.only('id', 'attachment').iterator():
+        Ticket.objects.filter(pk=ticket.pk).update(attachment_name=os.path.basename(ticket.attachment.name))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Student', '0019_ticket_search'),
+        ('core', '0015_attachmentblob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='attachment_name',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='ticket',
+            name='attachment',
+            field=models.FileField(blank=True, null=True, storage=core.storage.ContentAddressedStorage(), upload_to='ticket_attachments/', validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['pdf', 'doc', 'docx', 'txt', 'jpg', 'jpeg', 'png']), Student.models.validate_file_size]),
+        ),
+        migrations.RunPython(fill_attachment_names, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Student', '0020_ticket_attachment_blobs'),
+        ('core', '0015_attachmentblob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['updated_at', 'id'], name='Student_tic_updated_18213f_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:46
+
+from django.db import migrations, models
+
+
+def create_version_row(apps, schema_editor):
+    apps.get_model('Student', 'LookupVersion').objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Student', '0021_ticket_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LookupVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_version_row, migrations.RunPython.noop),
+    ]
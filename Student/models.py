@@ -1,15 +1,20 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, F, Value, When
 from django.contrib.auth.models import User
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.utils import timezone
-import uuid
 from core.models import Department
+from core.sequences import next_ticket_id
+from core.storage import attachment_storage, discard_unreferenced_blob
 from django.core.validators import FileExtensionValidator
 from django.core.exceptions import ValidationError
 from django.conf import settings
+import logging
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
 
 PRIORITY_CHOICES = [
     ('low', 'Low'),
@@ -27,6 +32,9 @@ STATUS_CHOICES = [
     ('closed', 'Closed'),
 ]
 
+# Tickets in these statuses can no longer be escalated
+NOT_ESCALATABLE_STATUSES = ['resolved', 'closed', 'escalated']
+
 # For update forms, exclude 'escalated' so users can't set it directly
 STATUS_CHOICES_FOR_UPDATE = [
     ('open', 'Open'),
@@ -36,9 +44,12 @@ STATUS_CHOICES_FOR_UPDATE = [
     ('closed', 'Closed'),
 ]
 
+# Materialized SLA deadlines on Ticket, kept in sync with SLAConfig
+SLA_DEADLINE_FIELDS = ['response_due_at', 'resolution_due_at', 'escalation_due_at']
+
 def validate_file_size(value):
     filesize = value.size
-    if filesize > 5 * 1024 * 1024:  # 5MB
+    if filesize > settings.MAX_UPLOAD_SIZE:
         raise ValidationError("The maximum file size that can be uploaded is 5MB")
 
 class SLAConfig(models.Model):
@@ -74,6 +85,92 @@ class SLAConfig(models.Model):
             self.escalation_time_hours = 24
         super().save(*args, **kwargs)
 
+class TicketManager(models.Manager):
+    def bulk_escalate(self, queryset, escalated_by, reason=None):
+        """
+        Escalate every ticket in ``queryset`` to the General department in
+        one transaction: a single UPDATE per batch (``original_department``
+        is copied from ``department`` in SQL), bulk-inserted TicketUpdate and
+        LogEntry audit rows, and one queued digest email per recipient.
+        Resolved, closed and already escalated tickets are skipped.
+
+        Returns the list of escalated tickets.
+        """
+        from django.contrib.admin.models import LogEntry, CHANGE
+        from django.contrib.contenttypes.models import ContentType
+        from core.utils import send_escalation_digest
+        from .lookups import get_general_department, get_sla_config
+        from .search import index_tickets
+        from .sla import in_batches
+
+        general_dept = get_general_department()
+        now = timezone.now()
+        comment = f"Ticket escalated to General department. Reason: {reason or 'SLA breach'}"
+
+        # Deadlines move to the General department's SLA for each priority
+        deadlines = {}
+        for field, hours in [
+            ('response_due_at', 'response_time_hours'),
+            ('resolution_due_at', 'resolution_time_hours'),
+            ('escalation_due_at', 'escalation_time_hours'),
+        ]:
+            whens = [
+                When(priority=priority, then=F('created_at') + timedelta(hours=getattr(config, hours)))
+                for priority, config in (
+                    (priority, get_sla_config(general_dept.pk, priority)) for priority, _ in PRIORITY_CHOICES
+                )
+                if config is not None
+            ]
+            deadlines[field] = Case(*whens, default=Value(None), output_field=models.DateTimeField())
+
+        with transaction.atomic():
+            # Tickets locked by a concurrent escalation are left to it. The
+            # rest stay locked until commit, so every selected id is updated.
+            ids = list(
+                queryset.exclude(status__in=NOT_ESCALATABLE_STATUSES)
+                .select_for_update(skip_locked=True).order_by().values_list('id', flat=True)
+            )
+            content_type_id = ContentType.objects.get_for_model(self.model).id
+            tickets = []
+            for batch in in_batches(ids):
+                self.filter(id__in=batch).update(
+                    original_department_id=F('department_id'),
+                    department_id=general_dept.pk,
+                    status='escalated',
+                    escalated_at=now,
+                    escalated_by=escalated_by,
+                    escalation_reason=reason,
+                    updated_at=now,
+                    **deadlines,
+                )
+                escalated = list(
+                    self.filter(id__in=batch)
+                    .select_related('student', 'department', 'original_department')
+                    .order_by('id')
+                )
+                TicketUpdate.objects.bulk_create([
+                    TicketUpdate(ticket=ticket, user=escalated_by, comment=comment, is_internal=True)
+                    for ticket in escalated
+                ])
+                # bulk_create skips the signal that indexes new comments
+                index_tickets(batch)
+                LogEntry.objects.bulk_create([
+                    LogEntry(
+                        user_id=escalated_by.id,
+                        content_type_id=content_type_id,
+                        object_id=str(ticket.id),
+                        object_repr=str(ticket),
+                        action_flag=CHANGE,
+                        change_message=comment,
+                    )
+                    for ticket in escalated
+                ])
+                tickets.extend(escalated)
+            if tickets:
+                send_escalation_digest(tickets, escalated_by, reason)
+        return tickets
+
+
 class Ticket(models.Model):
     ticket_id = models.CharField(max_length=20, unique=True, editable=False)
     student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='student_tickets')
@@ -91,8 +188,14 @@ class Ticket(models.Model):
     escalated_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='escalated_tickets')
     escalation_reason = models.TextField(null=True, blank=True)
     original_department = models.ForeignKey(Department, on_delete=models.SET_NULL, null=True, related_name='original_tickets')
+    # SLA deadlines, computed from SLAConfig on save so they can be indexed
+    response_due_at = models.DateTimeField(null=True, blank=True, editable=False)
+    resolution_due_at = models.DateTimeField(null=True, blank=True, editable=False)
+    escalation_due_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # Stored once per distinct content, shared between tickets (see core/storage.py)
     attachment = models.FileField(
         upload_to='ticket_attachments/',
+        storage=attachment_storage,
         null=True,
         blank=True,
         validators=[
@@ -102,43 +205,85 @@ class Ticket(models.Model):
             validate_file_size
         ]
     )
+    # The uploaded file's own name; the stored file is named by its hash
+    attachment_name = models.CharField(max_length=255, blank=True)
+
+    objects = TicketManager()
     
     def save(self, *args, **kwargs):
         if not self.ticket_id:
-            year = timezone.now().strftime('%Y')
-            dept_code = self.department.name[:3].upper()
-            random_id = str(uuid.uuid4()).upper()[:4]
-            self.ticket_id = f'AU-{year}-{dept_code}-{random_id}'
+            # Sequence-backed, so IDs never collide under concurrent submissions
+            self.ticket_id = next_ticket_id(self.department.name)
+
+        storing_attachment = bool(self.attachment) and not self.attachment._committed
+        if storing_attachment:
+            self.attachment_name = os.path.basename(self.attachment.name)
         
         if self.status == 'resolved' and not self.resolved_at:
             self.resolved_at = timezone.now()
         elif self.status != 'resolved':
             self.resolved_at = None
-        
-        super().save(*args, **kwargs)
+
+        # Deadlines only depend on department and priority, so partial
+        # saves that touch neither can skip the SLAConfig lookup.
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            self.compute_sla_deadlines()
+        elif {'department', 'priority'} & set(update_fields):
+            self.compute_sla_deadlines()
+            kwargs['update_fields'] = set(update_fields) | set(SLA_DEADLINE_FIELDS)
+
+        if not storing_attachment:
+            super().save(*args, **kwargs)
+            return
+        # Storing the file and counting the ticket's reference to it commit
+        # together; a failed save must not leave the stored file orphaned
+        try:
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+        except Exception:
+            if self.attachment._committed:
+                discard_unreferenced_blob(self.attachment.name)
+            raise
 
     def __str__(self):
         return self.ticket_id
 
+    def compute_sla_deadlines(self, sla_config=None):
+        """
+        Set response/resolution/escalation deadlines from the SLAConfig for
+        this ticket's department and priority. Tickets without a matching
+        configuration get no deadlines.
+        """
+        if sla_config is None:
+            from .lookups import get_sla_config
+            sla_config = get_sla_config(self.department_id, self.priority)
+
+        if sla_config is None:
+            self.response_due_at = None
+            self.resolution_due_at = None
+            self.escalation_due_at = None
+            return
+
+        # New tickets get created_at from auto_now_add during save()
+        start = self.created_at or timezone.now()
+        self.response_due_at = start + timedelta(hours=sla_config.response_time_hours)
+        self.resolution_due_at = start + timedelta(hours=sla_config.resolution_time_hours)
+        self.escalation_due_at = start + timedelta(hours=sla_config.escalation_time_hours)
+
     @property
     def is_sla_breached(self):
         if self.status in ['resolved', 'closed']:
             return False
-        
-        sla_config = SLAConfig.objects.get(
-            department=self.department,
-            priority=self.priority
-        )
-        
+
+        now = timezone.now()
+
         # Check response time SLA
-        if not self.first_response_at:
-            time_since_creation = timezone.now() - self.created_at
-            if time_since_creation.total_seconds() / 3600 > sla_config.response_time_hours:
-                return True
-        
+        if not self.first_response_at and self.response_due_at and now > self.response_due_at:
+            return True
+
         # Check resolution time SLA
-        time_since_creation = timezone.now() - self.created_at
-        if time_since_creation.total_seconds() / 3600 > sla_config.resolution_time_hours:
+        if self.resolution_due_at and now > self.resolution_due_at:
             return True
             
         return False
@@ -148,13 +293,7 @@ class Ticket(models.Model):
         if self.status in ['resolved', 'closed']:
             return False
 
-        sla_config = SLAConfig.objects.get(
-            department=self.department,
-            priority=self.priority
-        )
-
-        time_since_creation = timezone.now() - self.created_at
-        return time_since_creation.total_seconds() / 3600 > sla_config.escalation_time_hours
+        return bool(self.escalation_due_at and timezone.now() > self.escalation_due_at)
 
     def escalate(self, escalated_by, reason=None):
         """
@@ -170,81 +309,79 @@ class Ticket(models.Model):
         Raises:
             Exception: If ticket is already resolved/closed or if escalation fails
         """
-        print(f"[DEBUG] ===== ESCALATION STARTED =====", flush=True)
-        print(f"[DEBUG] Ticket ID: {self.ticket_id}", flush=True)
-        print(f"[DEBUG] Current status: {self.status}", flush=True)
-        print(f"[DEBUG] Escalated by: {escalated_by}", flush=True)
-        print(f"[DEBUG] Student: {self.student.get_full_name()} ({self.student.email})", flush=True)
+        logger.debug("Escalating ticket %s (status %s) by %s", self.ticket_id, self.status, escalated_by)
         
         # Validate ticket can be escalated
         if self.status in ['resolved', 'closed']:
-            error_msg = f"Cannot escalate a ticket that is already {self.status}."
-            print(f"[ERROR] {error_msg}", flush=True)
-            raise Exception(error_msg)
+            raise Exception(f"Cannot escalate a ticket that is already {self.status}.")
             
         # If already escalated, just return
         if self.status == 'escalated':
-            print(f"[INFO] Ticket {self.ticket_id} is already escalated", flush=True)
+            logger.info("Ticket %s is already escalated", self.ticket_id)
             return False
             
         try:
-            # Store the original department before changing it
-            self.original_department = self.department
-            print(f"[DEBUG] Original department: {self.original_department}", flush=True)
-            
             # Get or create the General department
-            general_dept, created = Department.objects.get_or_create(
-                name='General',
-                defaults={'sla_hours': 24}  # 24-hour SLA for escalated tickets
-            )
-            print(f"[DEBUG] {'Created new' if created else 'Found existing'} General department", flush=True)
-            
-            # Update ticket fields
-            self.department = general_dept
-            self.status = 'escalated'
-            self.escalated_at = timezone.now()
-            self.escalated_by = escalated_by
-            self.escalation_reason = reason
-            
-            # Save the ticket
-            self.save()
-            print(f"[DEBUG] Ticket saved with escalated status", flush=True)
-            print(f"[DEBUG] New department: {self.department}", flush=True)
-            print(f"[DEBUG] Escalation time: {self.escalated_at}", flush=True)
-
-            # Create ticket update for escalation
-            update_comment = f"Ticket escalated to General department. Reason: {reason or 'SLA breach'}"
-            print(f"[DEBUG] Creating ticket update: {update_comment}", flush=True)
-            TicketUpdate.objects.create(
-                ticket=self,
-                user=escalated_by,
-                comment=update_comment,
-                is_internal=True
-            )
+            from .lookups import get_general_department
+            general_dept = get_general_department()
+            now = timezone.now()
+
+            with transaction.atomic():
+                # Skip the row if another worker holds it, then claim it with a
+                # conditional UPDATE so only one caller performs the escalation
+                locked = Ticket.objects.select_for_update(skip_locked=True).filter(pk=self.pk)
+                claimed = Ticket.objects.filter(
+                    pk__in=list(locked.values_list('pk', flat=True)),
+                ).exclude(status__in=NOT_ESCALATABLE_STATUSES).update(
+                    original_department_id=F('department_id'),
+                    department_id=general_dept.pk,
+                    status='escalated',
+                    escalated_at=now,
+                    escalated_by=escalated_by,
+                    escalation_reason=reason,
+                    updated_at=now,
+                )
+                self.refresh_from_db()
+                if not claimed:
+                    if self.status in ['resolved', 'closed']:
+                        raise Exception(f"Cannot escalate a ticket that is already {self.status}.")
+                    logger.info("Ticket %s was escalated by another request", self.ticket_id)
+                    return False
+
+                # Deadlines follow the General department's SLA from now on
+                self.compute_sla_deadlines()
+                self.save(update_fields=SLA_DEADLINE_FIELDS)
+
+                # Create ticket update for escalation
+                update_comment = f"Ticket escalated to General department. Reason: {reason or 'SLA breach'}"
+                TicketUpdate.objects.create(
+                    ticket=self,
+                    user=escalated_by,
+                    comment=update_comment,
+                    is_internal=True
+                )
             
-            # Log the escalation in admin
-            from django.contrib.admin.models import LogEntry, CHANGE
-            from django.contrib.contenttypes.models import ContentType
-            print("[DEBUG] Logging escalation to admin...", flush=True)
-            LogEntry.objects.create(
-                user_id=escalated_by.id,
-                content_type_id=ContentType.objects.get_for_model(self).id,
-                object_id=self.id,
-                object_repr=str(self),
-                action_flag=CHANGE,
-                change_message=update_comment
-            )
+                # Log the escalation in admin
+                from django.contrib.admin.models import LogEntry, CHANGE
+                from django.contrib.contenttypes.models import ContentType
+                LogEntry.objects.create(
+                    user_id=escalated_by.id,
+                    content_type_id=ContentType.objects.get_for_model(self).id,
+                    object_id=self.id,
+                    object_repr=str(self),
+                    action_flag=CHANGE,
+                    change_message=update_comment
+                )
             
-            # Send notifications to all relevant parties
-            self._send_escalation_notifications(escalated_by, reason)
+                # Send notifications to all relevant parties
+                self._send_escalation_notifications(escalated_by, reason)
             
-            print(f"[DEBUG] Ticket {self.ticket_id} successfully escalated", flush=True)
+            logger.info("Ticket %s escalated from %s to %s", self.ticket_id, self.original_department, self.department)
             return True
             
         except Exception as e:
-            error_msg = f"Failed to escalate ticket {self.ticket_id}: {str(e)}"
-            print(f"[ERROR] {error_msg}", flush=True)
-            raise Exception(error_msg) from e
+            logger.exception("Failed to escalate ticket %s", self.ticket_id)
+            raise Exception(f"Failed to escalate ticket {self.ticket_id}: {str(e)}") from e
     
     def _send_escalation_notifications(self, escalated_by, reason=None):
         """
@@ -256,17 +393,14 @@ class Ticket(models.Model):
         """
         from core.utils import send_escalation_notification_to_admins
         
-        print("[DEBUG] Sending escalation notifications...", flush=True)
         try:
             # This will send notifications to:
             # 1. The student who created the ticket
             # 2. Department admins
             # 3. General support team
             send_escalation_notification_to_admins(self, escalated_by, reason)
-            print("[DEBUG] Escalation notifications sent successfully", flush=True)
-        except Exception as e:
-            error_msg = f"Failed to send escalation notifications: {str(e)}"
-            print(f"[ERROR] {error_msg}", flush=True)
+        except Exception:
+            logger.exception("Failed to send escalation notifications for ticket %s", self.ticket_id)
             # Don't raise the exception here to prevent the escalation from failing
             # just because notifications failed
 
@@ -278,6 +412,26 @@ class Ticket(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'escalation_due_at']),
+            models.Index(fields=['status', 'resolution_due_at']),
+            models.Index(fields=['status', 'response_due_at']),
+            # Keyset pagination of ticket lists (see core.pagination)
+            models.Index(fields=['department', '-created_at', '-id']),
+            models.Index(fields=['department', '-escalated_at', '-id']),
+            models.Index(fields=['student', '-created_at', '-id']),
+            # Dashboard counts by status (TicketStats)
+            models.Index(fields=['department', 'status']),
+            models.Index(fields=['student', 'status']),
+            # Incremental scans of recently changed tickets (rollup, SLA watcher)
+            models.Index(fields=['updated_at', 'id']),
+            # Per-priority work queues only ever list open tickets
+            models.Index(
+                fields=['department', 'priority', '-created_at', '-id'],
+                condition=models.Q(status__in=['open', 'in_progress', 'on_hold']),
+                name='ticket_open_priority_idx',
+            ),
+        ]
 
 class TicketUpdate(models.Model):
     ticket = models.ForeignKey(Ticket, on_delete=models.CASCADE, related_name='updates')
@@ -300,3 +454,54 @@ class SLABreachLog(models.Model):
 
     def __str__(self):
         return f"SLA Breach - {self.ticket.ticket_id} - {self.breach_type}"
+
+    class Meta:
+        indexes = [
+            # Breach reports and rollups filter on a breached_at window
+            models.Index(fields=['breached_at', 'ticket']),
+        ]
+        constraints = [
+            # A ticket is logged at most once per breach type, however many SLA workers run
+            models.UniqueConstraint(fields=['ticket', 'breach_type'], name='unique_ticket_breach_type'),
+        ]
+
+class DailySLAStats(models.Model):
+    """
+    Per-day SLA rollup maintained by the ``refresh_sla_stats`` command.
+
+    Ticket counts and resolution times are attributed to the day the
+    tickets were created; breaches to the day they were logged.
+    """
+    date = models.DateField()
+    department = models.ForeignKey(Department, on_delete=models.CASCADE)
+    priority = models.CharField(max_length=10, choices=PRIORITY_CHOICES)
+    created_count = models.PositiveIntegerField(default=0)
+    resolved_count = models.PositiveIntegerField(default=0)
+    breached_count = models.PositiveIntegerField(default=0)
+    resolution_time_total = models.DurationField(default=timedelta(0))
+
+    class Meta:
+        unique_together = ['date', 'department', 'priority']
+        verbose_name = "Daily SLA Statistics"
+        verbose_name_plural = "Daily SLA Statistics"
+
+    def __str__(self):
+        return f"{self.date} - {self.department.name} - {self.get_priority_display()}"
+
+class RollupWatermark(models.Model):
+    """Point up to which a rollup has processed changed rows."""
+    name = models.CharField(max_length=50, unique=True)
+    value = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name} @ {self.value}"
+
+class LookupVersion(models.Model):
+    """
+    Single-row stamp bumped whenever a Department or SLAConfig changes, so
+    every process can tell when its cached lookups (see lookups.py) are stale.
+    """
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"lookups v{self.version}"
@@ -0,0 +1,163 @@
+"""
+Full-text ticket search.
+
+Each ticket has one row in the ``ticket_search`` index holding its subject
+and, as a second weighted column, its description plus every update
+comment. On SQLite the index is an FTS5 table ranked with bm25; on
+PostgreSQL it is a ``tsvector`` column with a GIN index ranked with
+``ts_rank``. Signals in Student/signals.py keep rows current as tickets
+and updates change; the table itself is created by migration 0019.
+Other databases fall back to ``icontains`` filters.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Ticket, TicketUpdate
+
+SEARCH_TABLE = 'ticket_search'
+DEFAULT_LIMIT = 50
+
+# Subject matches rank above description/comment matches
+SUBJECT_WEIGHT = 10.0
+BODY_WEIGHT = 1.0
+
+
+def search_backend():
+    """'sqlite', 'postgresql' or None when full-text search is unavailable."""
+    return connection.vendor if connection.vendor in ('sqlite', 'postgresql') else None
+
+
+def _documents(ticket_ids):
+    """``{ticket_id: (subject, body)}`` for the given tickets."""
+    documents = {
+        pk: [subject, [description]]
+        for pk, subject, description in Ticket.objects.filter(id__in=ticket_ids).values_list(
+            'id', 'subject', 'description',
+        )
+    }
+    comments = TicketUpdate.objects.filter(ticket_id__in=ticket_ids).order_by('id').values_list('ticket_id', 'comment')
+    for ticket_id, comment in comments:
+        documents[ticket_id][1].append(comment)
+    return {pk: (subject, '\n'.join(body)) for pk, (subject, body) in documents.items()}
+
+
+def index_tickets(ticket_ids):
+    """(Re)index the given tickets; ids of deleted tickets are removed from the index."""
+    backend = search_backend()
+    ticket_ids = list(ticket_ids)
+    if backend is None or not ticket_ids:
+        return
+    documents = _documents(ticket_ids)
+    placeholders = ', '.join(['%s'] * len(ticket_ids))
+    with connection.cursor() as cursor:
+        if backend == 'sqlite':
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})", ticket_ids)
+            cursor.executemany(
+                f"INSERT INTO {SEARCH_TABLE} (rowid, subject, body) VALUES (%s, %s, %s)",
+                [(pk, subject, body) for pk, (subject, body) in documents.items()],
+            )
+        else:
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE ticket_id IN ({placeholders})", ticket_ids)
+            cursor.executemany(
+                f"INSERT INTO {SEARCH_TABLE} (ticket_id, document) VALUES "
+                f"(%s, setweight(to_tsvector('english', %s), 'A') || setweight(to_tsvector('english', %s), 'B'))",
+                [(pk, subject, body) for pk, (subject, body) in documents.items()],
+            )
+
+
+def rebuild_search_index(batch_size=500):
+    """Reindex every ticket. Returns the number of tickets indexed."""
+    ids = list(Ticket.objects.order_by('id').values_list('id', flat=True))
+    for start in range(0, len(ids), batch_size):
+        index_tickets(ids[start:start + batch_size])
+    return len(ids)
+
+
+def _fts5_query(query):
+    # Quote every word so user input cannot inject FTS5 operators; the
+    # trailing * makes the last word a prefix match for search-as-you-type
+    words = re.findall(r'\w+', query)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def _match_sql(query, queryset, limit, ranked=True):
+    """
+    ``(sql, params)`` of a query selecting the ids of tickets in
+    ``queryset`` that match ``query``, or None when nothing can match.
+    """
+    candidates, candidate_params = queryset.order_by().values('id').query.sql_with_params()
+    limit_sql = '' if limit is None else f' LIMIT {int(limit)}'
+    if search_backend() == 'sqlite':
+        match = _fts5_query(query)
+        if match is None:
+            return None
+        order_sql = f" ORDER BY bm25({SEARCH_TABLE}, {SUBJECT_WEIGHT}, {BODY_WEIGHT})" if ranked else ''
+        sql = (
+            f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s AND rowid IN ({candidates})"
+            f"{order_sql}{limit_sql}"
+        )
+        return sql, [match, *candidate_params]
+    order_sql = " ORDER BY ts_rank(document, q) DESC" if ranked else ''
+    sql = (
+        f"SELECT ticket_id FROM {SEARCH_TABLE}, websearch_to_tsquery('english', %s) AS q "
+        f"WHERE document @@ q AND ticket_id IN ({candidates}){order_sql}{limit_sql}"
+    )
+    return sql, [query, *candidate_params]
+
+
+def _icontains_matches(query, queryset):
+    return queryset.filter(
+        Q(subject__icontains=query) | Q(description__icontains=query) | Q(updates__comment__icontains=query)
+    )
+
+
+def search_ticket_ids(query, queryset=None, limit=DEFAULT_LIMIT):
+    """
+    IDs of tickets matching ``query``, best match first. ``queryset``
+    restricts the candidates (e.g. to one department); ``limit=None``
+    returns every match.
+    """
+    queryset = Ticket.objects.all() if queryset is None else queryset
+
+    if search_backend() is None:
+        matches = _icontains_matches(query, queryset).distinct().order_by('-created_at').values_list('id', flat=True)
+        return list(matches if limit is None else matches[:limit])
+
+    match_sql = _match_sql(query, queryset, limit)
+    if match_sql is None:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(*match_sql)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def filter_tickets(query, queryset=None):
+    """
+    ``queryset`` narrowed to tickets matching ``query``, unordered. The
+    match runs as a subquery, so no id list is sent back to the database;
+    use it where the caller applies its own ordering (e.g. the admin).
+    """
+    queryset = Ticket.objects.all() if queryset is None else queryset
+
+    if search_backend() is None:
+        return queryset.filter(pk__in=_icontains_matches(query, queryset).values('id'))
+
+    match_sql = _match_sql(query, queryset, limit=None, ranked=False)
+    if match_sql is None:
+        return queryset.none()
+    return queryset.filter(pk__in=RawSQL(*match_sql))
+
+
+def search_tickets(query, queryset=None, limit=DEFAULT_LIMIT):
+    """Tickets matching ``query`` as a list, best match first."""
+    queryset = Ticket.objects.all() if queryset is None else queryset
+    ids = search_ticket_ids(query, queryset, limit)
+    tickets = queryset.filter(id__in=ids).select_related('student', 'department').in_bulk()
+    return [tickets[pk] for pk in ids if pk in tickets]
@@ -1,9 +1,13 @@
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_init, post_save, post_delete, pre_save
 from django.dispatch import receiver
 from django.contrib.auth.models import User
+from django.core.files import File
 from core.models import Profile
 from django.utils import timezone
-from .models import TicketUpdate, Ticket
+from core.models import Department
+from core.storage import acquire_blob, release_blob
+from .models import TicketUpdate, Ticket, SLAConfig
+from . import lookups, search
 
 # Signal handlers have been moved to core.signals
 # This file is kept for future student-specific signals if needed
@@ -23,3 +27,58 @@ def update_resolution_time(sender, instance, **kwargs):
         instance.resolved_at = timezone.now()
     elif instance.status != 'resolved':
         instance.resolved_at = None
+
+@receiver(post_save, sender=SLAConfig)
+@receiver(post_delete, sender=SLAConfig)
+def refresh_ticket_sla_deadlines(sender, instance, **kwargs):
+    from .sla import refresh_sla_deadlines
+    refresh_sla_deadlines(instance.department_id, instance.priority)
+
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+@receiver(post_save, sender=SLAConfig)
+@receiver(post_delete, sender=SLAConfig)
+def invalidate_lookups(sender, **kwargs):
+    lookups.invalidate()
+
+@receiver(post_save, sender=Ticket)
+def index_ticket(sender, instance, created, update_fields=None, **kwargs):
+    # Only the subject and description of a ticket are indexed
+    if created or update_fields is None or {'subject', 'description'} & set(update_fields):
+        search.index_tickets([instance.pk])
+
+@receiver(post_delete, sender=Ticket)
+def unindex_ticket(sender, instance, **kwargs):
+    search.index_tickets([instance.pk])
+
+@receiver(post_save, sender=TicketUpdate)
+@receiver(post_delete, sender=TicketUpdate)
+def index_ticket_comments(sender, instance, **kwargs):
+    search.index_tickets([instance.ticket_id])
+
+@receiver(post_init, sender=Ticket)
+def remember_attachment(sender, instance, **kwargs):
+    # The stored file name as loaded, read raw so no FieldFile is built.
+    # Ticket(attachment=upload) holds a file that is not stored yet.
+    attachment = instance.__dict__.get('attachment')
+    if isinstance(attachment, File):
+        attachment = attachment.name if getattr(attachment, '_committed', False) else None
+    instance._saved_attachment = attachment or None
+
+@receiver(post_save, sender=Ticket)
+def count_attachment_reference(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and 'attachment' not in update_fields:
+        return
+    current = instance.attachment.name or None
+    previous = instance._saved_attachment
+    if current != previous:
+        if current:
+            acquire_blob(current)
+        if previous:
+            release_blob(previous)
+        instance._saved_attachment = current
+
+@receiver(post_delete, sender=Ticket)
+def release_attachment_reference(sender, instance, **kwargs):
+    if instance._saved_attachment:
+        release_blob(instance._saved_attachment)
@@ -0,0 +1,162 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from core.digests import buffer_notifications
+from .models import Ticket, SLAConfig, SLABreachLog, SLA_DEADLINE_FIELDS
+
+# Statuses the SLA checker watches. Escalated tickets already left their
+# original department, resolved/closed ones can no longer breach.
+OPEN_STATUSES = ['open', 'in_progress', 'on_hold']
+
+# Statuses whose deadlines are frozen once reached
+CLOSED_STATUSES = ['resolved', 'closed']
+
+# Keeps ``id IN (...)`` lists under SQLite's bound-parameter limit.
+SCAN_BATCH_SIZE = 500
+
+
+def find_breached_ticket_ids(now=None, ids=None):
+    """
+    Return ``{ticket_id: breach_type}`` for open tickets that have breached
+    their SLA and are not yet flagged with ``sla_breach``.
+
+    Mirrors ``Ticket.is_sla_breached``: a ticket breaches when it has no
+    first response past the response deadline, or is past the resolution
+    deadline. The breach type is 'response' while the ticket is still
+    waiting for a first response, 'resolution' otherwise. Both branches
+    are range scans on the (status, *_due_at) indexes. ``ids`` limits the
+    check to the given tickets.
+    """
+    now = now or timezone.now()
+    tickets = Ticket.objects.all() if ids is None else Ticket.objects.filter(id__in=ids)
+    rows = tickets.filter(
+        status__in=OPEN_STATUSES,
+        sla_breach=False,
+    ).filter(
+        Q(first_response_at__isnull=True, response_due_at__lte=now)
+        | Q(resolution_due_at__lte=now)
+    ).order_by().values_list('id', 'first_response_at')
+
+    return {
+        ticket_id: 'response' if first_response_at is None else 'resolution'
+        for ticket_id, first_response_at in rows
+    }
+
+
+def find_escalatable_ticket_ids(now=None, ids=None):
+    """
+    Return IDs of open tickets that are past their escalation deadline,
+    optionally only among ``ids``.
+    """
+    now = now or timezone.now()
+    tickets = Ticket.objects.all() if ids is None else Ticket.objects.filter(id__in=ids)
+    return list(
+        tickets.filter(
+            status__in=OPEN_STATUSES,
+            escalation_due_at__lte=now,
+        ).order_by().values_list('id', flat=True)
+    )
+
+
+def due_soon(queryset=None, within=timedelta(hours=4), now=None):
+    """
+    Open tickets whose resolution deadline falls within ``within`` from now,
+    most urgent (including already overdue) first.
+    """
+    now = now or timezone.now()
+    if queryset is None:
+        queryset = Ticket.objects.all()
+    return queryset.filter(
+        status__in=OPEN_STATUSES,
+        resolution_due_at__lte=now + within,
+    ).order_by('resolution_due_at')
+
+
+def refresh_sla_deadlines(department_id, priority):
+    """
+    Recompute the stored deadlines of every unresolved ticket in the given
+    department and priority after its SLAConfig changed, in one UPDATE.
+    Returns the number of tickets updated.
+    """
+    tickets = Ticket.objects.filter(
+        department_id=department_id,
+        priority=priority,
+    ).exclude(status__in=CLOSED_STATUSES)
+
+    config = SLAConfig.objects.filter(department_id=department_id, priority=priority).first()
+    if config is None:
+        return tickets.update(updated_at=timezone.now(), **{field: None for field in SLA_DEADLINE_FIELDS})
+
+    return tickets.update(
+        updated_at=timezone.now(),
+        response_due_at=F('created_at') + timedelta(hours=config.response_time_hours),
+        resolution_due_at=F('created_at') + timedelta(hours=config.resolution_time_hours),
+        escalation_due_at=F('created_at') + timedelta(hours=config.escalation_time_hours),
+    )
+
+
+def in_batches(items, size=SCAN_BATCH_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def record_breaches(breaches, now=None):
+    """
+    Flag the given tickets as breached and create their SLABreachLog rows.
+
+    ``breaches`` is the mapping returned by ``find_breached_ticket_ids``.
+    Safe to run from several SLA workers at once: tickets another worker
+    has locked are skipped, the conditional UPDATE only flags tickets not
+    yet flagged, and the unique (ticket, breach_type) constraint drops any
+    duplicate log. Returns the unnotified SLABreachLog objects for the
+    tickets this call flagged (with ``ticket`` and ``ticket.department``
+    already loaded for notification).
+    """
+    now = now or timezone.now()
+    logs = []
+    for batch in in_batches(breaches):
+        with transaction.atomic():
+            claimed = list(
+                Ticket.objects.filter(id__in=batch, sla_breach=False)
+                .select_for_update(skip_locked=True).order_by().values_list('id', flat=True)
+            )
+            # update() skips auto_now, so bump updated_at explicitly
+            Ticket.objects.filter(id__in=claimed, sla_breach=False).update(
+                sla_breach=True, updated_at=now,
+            )
+            SLABreachLog.objects.bulk_create(
+                [SLABreachLog(ticket_id=ticket_id, breach_type=breaches[ticket_id]) for ticket_id in claimed],
+                ignore_conflicts=True,
+            )
+            logs.extend(
+                SLABreachLog.objects.filter(ticket_id__in=claimed, notified=False)
+                .select_related('ticket__department')
+            )
+    return logs
+
+
+def mark_breach_logs_notified(logs):
+    for log in logs:
+        log.notified = True
+    SLABreachLog.objects.bulk_update(logs, ['notified'], batch_size=SCAN_BATCH_SIZE)
+
+
+def notify_breaches(logs):
+    """
+    Buffer a department alert for each new breach log (sent as one digest
+    per department inbox) and mark the logs notified.
+    """
+    buffer_notifications([
+        (
+            f"{log.ticket.department.name.lower()}@apollouniversity.edu",
+            'sla_breach',
+            log.ticket,
+            f"{log.get_breach_type_display()} SLA breached",
+        )
+        for log in logs
+    ])
+    mark_breach_logs_notified(logs)
@@ -0,0 +1,151 @@
+from datetime import timedelta
+
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Ticket, SLABreachLog, DailySLAStats
+
+# Longest window the SLA dashboards accept in ``?days=``
+MAX_DASHBOARD_DAYS = 365
+
+# Named status buckets shown on the dashboards. Each one is counted with a
+# filtered COUNT, so any number of them costs a single aggregate query.
+BUCKETS = {
+    'total': None,
+    'open': Q(status='open'),
+    'pending': Q(status__in=['open', 'in_progress']),
+    'in_progress': Q(status='in_progress'),
+    'on_hold': Q(status='on_hold'),
+    'escalated': Q(status='escalated'),
+    'resolved': Q(status='resolved'),
+    'closed': Q(status='closed'),
+    'sla_breached': Q(sla_breach=True),
+    'sla_compliant': Q(sla_breach=False),
+}
+
+
+class TicketStats:
+    """
+    Ticket counts for a queryset, computed with one ``aggregate()`` call.
+
+    Counts are fetched lazily on first access and cached on the instance::
+
+        stats = TicketStats(Ticket.objects.filter(student=user))
+        stats['resolved'], stats.rate('resolved')
+    """
+
+    def __init__(self, queryset=None, buckets=None):
+        self.queryset = Ticket.objects.all() if queryset is None else queryset
+        self.buckets = list(buckets or BUCKETS)
+        self._counts = None
+
+    @classmethod
+    def for_student(cls, user, **kwargs):
+        return cls(Ticket.objects.filter(student=user), **kwargs)
+
+    @classmethod
+    def for_department(cls, department, **kwargs):
+        return cls(Ticket.objects.filter(department=department), **kwargs)
+
+    @property
+    def counts(self):
+        if self._counts is None:
+            # Ordering and select_related joins are irrelevant to the counts
+            self._counts = self.queryset.order_by().select_related(None).aggregate(**{
+                name: Count('pk', filter=BUCKETS[name]) for name in self.buckets
+            })
+        return self._counts
+
+    def __getitem__(self, name):
+        return self.counts[name]
+
+    def rate(self, name):
+        """Percentage of all tickets in bucket ``name`` (0 when there are none)."""
+        total = self.counts.get('total', 0)
+        return (self.counts[name] / total * 100) if total > 0 else 0
+
+
+RESOLUTION_TIME = ExpressionWrapper(F('resolved_at') - F('created_at'), output_field=DurationField())
+
+
+def _metric_aggregates():
+    return {
+        'total_tickets': Count('pk'),
+        'resolved_count': Count('pk', filter=Q(status='resolved')),
+        'avg_resolution_time': Avg(RESOLUTION_TIME, filter=Q(resolved_at__isnull=False)),
+    }
+
+
+def _add_rates(row):
+    total = row['total_tickets']
+    row['resolution_rate'] = (row['resolved_count'] / total * 100) if total > 0 else 0
+    row['breach_rate'] = (row.get('breach_count', 0) / total * 100) if total > 0 else 0
+    avg_time = row['avg_resolution_time']
+    row['avg_resolution_hours'] = avg_time.total_seconds() / 3600 if avg_time else 0
+    return row
+
+
+def overall_metrics(queryset):
+    """Totals, resolved count and average resolution time for ``queryset`` in one query."""
+    return _add_rates(queryset.order_by().aggregate(**_metric_aggregates()))
+
+
+def grouped_metrics(queryset, field, *extra, breaches_since=None):
+    """
+    Per-``field`` metrics for ``queryset`` in a single GROUP BY query.
+
+    Each row holds ``field`` (plus any ``extra`` values such as a display
+    name), the ticket total, resolved count, average resolution time and,
+    when ``breaches_since`` is given, the number of SLA breaches logged since
+    then for tickets in that group. Groups without tickets are omitted.
+    """
+    annotations = _metric_aggregates()
+    if breaches_since is not None:
+        breaches = SLABreachLog.objects.filter(
+            breached_at__gte=breaches_since,
+            **{f'ticket__{field}': OuterRef(field)}
+        ).order_by().values(f'ticket__{field}').annotate(count=Count('pk')).values('count')
+        annotations['breach_count'] = Coalesce(Subquery(breaches), 0)
+
+    rows = queryset.order_by().values(field, *extra).annotate(**annotations).order_by(*extra, field)
+    return [_add_rates(row) for row in rows]
+
+
+def dashboard_days(request, default=30):
+    """The ``?days=`` window of an SLA dashboard, clamped to 1..MAX_DASHBOARD_DAYS."""
+    try:
+        days = int(request.GET.get('days', default))
+    except (TypeError, ValueError):
+        days = default
+    return max(1, min(days, MAX_DASHBOARD_DAYS))
+
+
+def _rollup_row(row):
+    for key in ('total_tickets', 'resolved_count', 'breach_count'):
+        row[key] = row[key] or 0
+    total_time = row.pop('resolution_time_total')
+    row['avg_resolution_time'] = total_time / row['resolved_count'] if total_time and row['resolved_count'] else None
+    return _add_rates(row)
+
+
+def rollup_metrics(days, *group_by, **filters):
+    """
+    Metrics for the last ``days`` days summed from the DailySLAStats rollup,
+    so the cost depends on the number of rollup rows, not tickets.
+
+    Without ``group_by`` returns one dict of overall metrics; otherwise one
+    row per group, omitting groups that had no tickets in the window.
+    """
+    start = timezone.localdate() - timedelta(days=days)
+    stats = DailySLAStats.objects.filter(date__gt=start, **filters).order_by()
+    sums = {
+        'total_tickets': Sum('created_count'),
+        'resolved_count': Sum('resolved_count'),
+        'breach_count': Sum('breached_count'),
+        'resolution_time_total': Sum('resolution_time_total'),
+    }
+    if not group_by:
+        return _rollup_row(stats.aggregate(**sums))
+    rows = stats.values(*group_by).annotate(**sums).filter(total_tickets__gt=0).order_by(*group_by)
+    return [_rollup_row(row) for row in rows]
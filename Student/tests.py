@@ -1,3 +1,770 @@
+import os
+import re
+import unittest
+
 from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.urls import reverse
+from django.db import connection
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from core.models import Department
+from .models import Ticket, SLAConfig, SLABreachLog, DailySLAStats, LookupVersion
+from .sla import find_breached_ticket_ids, find_escalatable_ticket_ids, due_soon
+from .stats import TicketStats, grouped_metrics, overall_metrics, rollup_metrics
+from .rollup import refresh_daily_sla_stats, rebuild_days
 
 # Create your tests here.
+
+
+class SLAScannerTest(TestCase):
+    def setUp(self):
+        self.student = User.objects.create_user('240202400100', '240202400100@apollouniversity.edu.in', 'pass')
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'adminpass')
+        self.finance, _ = Department.objects.get_or_create(name='Finance')
+        self.hostel, _ = Department.objects.get_or_create(name='Hostel')
+        SLAConfig.objects.update_or_create(
+            department=self.finance, priority='high',
+            defaults={'response_time_hours': 4, 'resolution_time_hours': 8, 'escalation_time_hours': 24},
+        )
+
+    def make_ticket(self, hours_old, department=None, priority='high', **fields):
+        ticket = Ticket.objects.create(
+            student=self.student,
+            department=department or self.finance,
+            subject='Fee receipt missing',
+            description='My fee receipt was not generated.',
+            priority=priority,
+            **fields
+        )
+        # auto_now_add only applies on insert; re-saving recomputes deadlines
+        ticket.created_at = timezone.now() - timedelta(hours=hours_old)
+        ticket.save()
+        return ticket
+
+    def test_deadlines_are_persisted_on_save(self):
+        ticket = self.make_ticket(2)
+        self.assertEqual(ticket.response_due_at, ticket.created_at + timedelta(hours=4))
+        self.assertEqual(ticket.resolution_due_at, ticket.created_at + timedelta(hours=8))
+        self.assertEqual(ticket.escalation_due_at, ticket.created_at + timedelta(hours=24))
+
+        unconfigured = self.make_ticket(2, department=self.hostel)
+        self.assertIsNone(unconfigured.resolution_due_at)
+        self.assertFalse(unconfigured.is_sla_breached)
+        self.assertFalse(unconfigured.should_escalate())
+
+    def test_sla_config_change_recomputes_deadlines(self):
+        ticket = self.make_ticket(2)
+        resolved = self.make_ticket(2, status='resolved')
+        old_resolved_due = resolved.resolution_due_at
+
+        SLAConfig.objects.update_or_create(
+            department=self.finance, priority='high',
+            defaults={'resolution_time_hours': 1},
+        )
+        ticket.refresh_from_db()
+        resolved.refresh_from_db()
+        self.assertEqual(ticket.resolution_due_at, ticket.created_at + timedelta(hours=1))
+        self.assertTrue(ticket.is_sla_breached)
+        self.assertEqual(resolved.resolution_due_at, old_resolved_due)
+        self.assertEqual(list(due_soon(within=timedelta(0))), [ticket])
+
+        SLAConfig.objects.filter(department=self.finance, priority='high').delete()
+        ticket.refresh_from_db()
+        self.assertIsNone(ticket.escalation_due_at)
+
+    def test_scanner_returns_only_breached_ids(self):
+        fresh = self.make_ticket(1)
+        no_response = self.make_ticket(5)
+        responded = self.make_ticket(5, first_response_at=timezone.now())
+        overdue = self.make_ticket(10, first_response_at=timezone.now())
+        stale = self.make_ticket(30)
+
+        with self.assertNumQueries(1):
+            breaches = find_breached_ticket_ids()
+        self.assertEqual(breaches, {
+            no_response.id: 'response',
+            overdue.id: 'resolution',
+            stale.id: 'response',
+        })
+        self.assertNotIn(fresh.id, breaches)
+        self.assertNotIn(responded.id, breaches)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(find_escalatable_ticket_ids(), [stale.id])
+
+    def test_missing_config_and_flagged_tickets_are_skipped(self):
+        unconfigured = self.make_ticket(100, department=self.hostel)
+        already_flagged = self.make_ticket(10, sla_breach=True)
+        resolved = self.make_ticket(100, status='resolved')
+
+        breaches = find_breached_ticket_ids()
+        for ticket in (unconfigured, already_flagged, resolved):
+            self.assertNotIn(ticket.id, breaches)
+        self.assertNotIn(unconfigured.id, find_escalatable_ticket_ids())
+
+    @patch('core.utils.send_escalation_notification_to_admins')
+    def test_check_sla_records_breaches_once(self, mock_escalation):
+        from core.models import PendingNotification
+        breached = self.make_ticket(10)
+        stale = self.make_ticket(30)
+
+        call_command('check_sla', stdout=StringIO())
+
+        breached.refresh_from_db()
+        stale.refresh_from_db()
+        self.assertTrue(breached.sla_breach)
+        self.assertEqual(stale.status, 'escalated')
+        self.assertEqual(SLABreachLog.objects.filter(notified=True).count(), 2)
+        # Breach alerts wait for the department digest
+        self.assertEqual(
+            PendingNotification.objects.filter(kind='sla_breach', recipient='finance@apollouniversity.edu').count(), 2,
+        )
+
+        # A second pass finds nothing new
+        call_command('check_sla', stdout=StringIO())
+        self.assertEqual(SLABreachLog.objects.count(), 2)
+
+
+class TicketStatsTest(TestCase):
+    def setUp(self):
+        self.student = User.objects.create_user('240202400100', '240202400100@apollouniversity.edu.in', 'pass')
+        self.finance, _ = Department.objects.get_or_create(name='Finance')
+        for status, sla_breach in [('open', False), ('in_progress', True), ('resolved', False), ('resolved', False), ('escalated', True)]:
+            Ticket.objects.create(
+                student=self.student, department=self.finance, subject='Fee receipt missing',
+                description='My fee receipt was not generated.', status=status, sla_breach=sla_breach,
+            )
+
+    def test_all_buckets_cost_one_query(self):
+        stats = TicketStats.for_student(self.student)
+        with self.assertNumQueries(1):
+            self.assertEqual(stats['total'], 5)
+            self.assertEqual(stats['pending'], 2)
+            self.assertEqual(stats['resolved'], 2)
+            self.assertEqual(stats['escalated'], 1)
+            self.assertEqual(stats['sla_compliant'], 3)
+            self.assertEqual(stats.rate('resolved'), 40)
+
+    def test_landingpage_counts(self):
+        self.student.profile.must_change_password = False
+        self.student.profile.save()
+        self.client.force_login(self.student)
+        response = self.client.get(reverse('student:landingpage'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total'], 5)
+        self.assertEqual(response.context['pending'], 2)
+
+
+class GroupedMetricsTest(TestCase):
+    def setUp(self):
+        self.student = User.objects.create_user('240202400100', '240202400100@apollouniversity.edu.in', 'pass')
+        self.since = timezone.now() - timedelta(days=30)
+
+    def make_tickets(self, department):
+        now = timezone.now()
+        open_ticket = Ticket.objects.create(
+            student=self.student, department=department, subject='Fee receipt missing',
+            description='My fee receipt was not generated.', priority='high',
+        )
+        resolved = Ticket.objects.create(
+            student=self.student, department=department, subject='Fee receipt missing',
+            description='My fee receipt was not generated.', priority='low', status='resolved',
+        )
+        Ticket.objects.filter(pk=resolved.pk).update(created_at=now - timedelta(hours=6), resolved_at=now)
+        SLABreachLog.objects.create(ticket=open_ticket, breach_type='response')
+
+    def test_metrics_cost_constant_queries(self):
+        for name in ['Finance', 'Hostel', 'Mess']:
+            self.make_tickets(Department.objects.get_or_create(name=name)[0])
+        tickets = Ticket.objects.filter(created_at__gte=self.since)
+
+        with self.assertNumQueries(1):
+            by_department = grouped_metrics(tickets, 'department', 'department__name', breaches_since=self.since)
+        self.assertEqual([row['department__name'] for row in by_department], ['Finance', 'Hostel', 'Mess'])
+        for row in by_department:
+            self.assertEqual((row['total_tickets'], row['resolved_count'], row['breach_count']), (2, 1, 1))
+            self.assertEqual(row['resolution_rate'], 50)
+            self.assertAlmostEqual(row['avg_resolution_hours'], 6, places=2)
+
+        with self.assertNumQueries(1):
+            by_priority = {row['priority']: row for row in grouped_metrics(tickets, 'priority', breaches_since=self.since)}
+        self.assertEqual(by_priority['high']['breach_count'], 3)
+        self.assertEqual(by_priority['low']['breach_count'], 0)
+        self.assertEqual(by_priority['low']['resolution_rate'], 100)
+
+        overall = overall_metrics(tickets)
+        self.assertEqual(overall['total_tickets'], 6)
+        self.assertAlmostEqual(overall['avg_resolution_hours'], 6, places=2)
+
+    def test_sla_dashboard_query_count_does_not_grow(self):
+        self.student.profile.must_change_password = False
+        self.student.profile.save()
+        self.client.force_login(self.student)
+        self.make_tickets(Department.objects.get_or_create(name='Finance')[0])
+        refresh_daily_sla_stats()
+        with CaptureQueriesContext(connection) as few_departments:
+            self.client.get(reverse('student:sla_dashboard'))
+        for name in ['Hostel', 'Mess', 'Academics']:
+            self.make_tickets(Department.objects.get_or_create(name=name)[0])
+        refresh_daily_sla_stats()
+        with CaptureQueriesContext(connection) as more_departments:
+            response = self.client.get(reverse('student:sla_dashboard'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['department_metrics']), 4)
+        self.assertEqual(len(more_departments), len(few_departments))
+
+
+class DailySLAStatsTest(TestCase):
+    def setUp(self):
+        self.student = User.objects.create_user('240202400100', '240202400100@apollouniversity.edu.in', 'pass')
+        self.finance, _ = Department.objects.get_or_create(name='Finance')
+        self.general, _ = Department.objects.get_or_create(name='General')
+
+    def make_ticket(self, days_old, **fields):
+        ticket = Ticket.objects.create(
+            student=self.student, department=self.finance, subject='Fee receipt missing',
+            description='My fee receipt was not generated.', priority='high', **fields
+        )
+        created_at = timezone.now() - timedelta(days=days_old)
+        Ticket.objects.filter(pk=ticket.pk).update(created_at=created_at, resolved_at=ticket.resolved_at and created_at + timedelta(hours=4))
+        ticket.refresh_from_db()
+        return ticket
+
+    def test_rollup_matches_tickets_and_breaches(self):
+        self.make_ticket(0)
+        self.make_ticket(0, status='resolved')
+        breached = self.make_ticket(40)
+        SLABreachLog.objects.create(ticket=breached, breach_type='response')
+
+        refresh_daily_sla_stats()
+
+        # Breaches count on the day they were logged, so today holds all three events
+        self.assertEqual(DailySLAStats.objects.count(), 2)
+        recent = rollup_metrics(30)
+        self.assertEqual((recent['total_tickets'], recent['resolved_count'], recent['breach_count']), (2, 1, 1))
+        self.assertEqual(recent['avg_resolution_hours'], 4)
+        self.assertEqual(rollup_metrics(365)['total_tickets'], 3)
+        self.assertEqual(rollup_metrics(30, department=self.general)['total_tickets'], 0)
+
+    def test_incremental_refresh_only_recomputes_changed_days(self):
+        old = self.make_ticket(100)
+        moved = self.make_ticket(2)
+        refresh_daily_sla_stats()
+
+        # Moving the ticket to General must also fix the Finance row
+        moved.department = self.general
+        moved.save()
+        # Past the overlap window, so only the escalated ticket counts as changed
+        Ticket.objects.filter(pk=old.pk).update(updated_at=timezone.now() - timedelta(days=1))
+
+        with patch('Student.rollup.rebuild_days', wraps=rebuild_days) as mock_rebuild:
+            self.assertEqual(refresh_daily_sla_stats()[0], 1)
+        mock_rebuild.assert_called_once_with({timezone.localdate(moved.created_at)})
+
+        by_department = {row['department__name']: row['total_tickets'] for row in rollup_metrics(365, 'department__name')}
+        self.assertEqual(by_department, {'Finance': 1, 'General': 1})
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'Query plans are checked with SQLite EXPLAIN QUERY PLAN')
+class QueryPlanTest(TestCase):
+    """Hot ticket queries must be index searches, never full table scans."""
+
+    def assertNoFullScan(self, queryset):
+        plan = queryset.explain()
+        self.assertIsNone(re.search(r'\bSCAN (Student_ticket|Student_slabreachlog)\b', plan), f"{queryset.query}\n{plan}")
+
+    def test_hot_queries_use_indexes(self):
+        student = User.objects.create_user('240202400100', '240202400100@apollouniversity.edu.in', 'pass')
+        finance, _ = Department.objects.get_or_create(name='Finance')
+        since = timezone.now() - timedelta(days=30)
+
+        hot_queries = [
+            # TicketStats for a department or a student
+            Ticket.objects.filter(department=finance).order_by().values('status'),
+            Ticket.objects.filter(student=student, status='resolved'),
+            # Keyset pages of the department, escalated and per-priority lists
+            Ticket.objects.filter(department=finance, created_at__gte=since).order_by('-created_at', '-id')[:26],
+            Ticket.objects.filter(department=finance, escalated_at__lt=timezone.now()).order_by('-escalated_at', '-id')[:26],
+            Ticket.objects.filter(
+                department=finance, priority='high', status__in=['open', 'in_progress', 'on_hold'],
+            ).order_by('-created_at', '-id')[:26],
+            Ticket.objects.filter(student=student).order_by('-created_at', '-id')[:26],
+            # SLA scanner and breach reports
+            Ticket.objects.filter(status__in=['open', 'in_progress', 'on_hold'], escalation_due_at__lte=timezone.now()),
+            SLABreachLog.objects.filter(breached_at__gte=since),
+            SLABreachLog.objects.filter(breached_at__gte=since, ticket__department=finance),
+            # Incremental rollup refresh and SLA watcher
+            Ticket.objects.filter(updated_at__gte=since).order_by('updated_at', 'id'),
+            Ticket.objects.filter(updated_at__gte=since).order_by().values('id', 'status', 'escalation_due_at'),
+            SLABreachLog.objects.filter(ticket__in=Ticket.objects.filter(updated_at__gte=since).values('id')),
+        ]
+        for queryset in hot_queries:
+            self.assertNoFullScan(queryset)
+
+
+class LookupCacheTest(TestCase):
+    def setUp(self):
+        from . import lookups
+        self.lookups = lookups
+        lookups.invalidate()
+        self.addCleanup(lookups.invalidate)
+        self.student = User.objects.create_user('240202400100', '240202400100@apollouniversity.edu.in', 'pass')
+        self.finance, _ = Department.objects.get_or_create(name='Finance')
+        self.config = SLAConfig.objects.create(
+            department=self.finance, priority='high',
+            response_time_hours=4, resolution_time_hours=8, escalation_time_hours=24,
+        )
+
+    def test_hot_path_lookups_do_not_query(self):
+        self.lookups.get_sla_config(self.finance.pk, 'high')
+        ticket = Ticket(student=self.student, department=self.finance, priority='high')
+        with self.assertNumQueries(0):
+            ticket.compute_sla_deadlines()
+            self.assertEqual(self.lookups.get_department_by_name('Finance').pk, self.finance.pk)
+            self.assertEqual(self.lookups.get_general_department().name, 'General')
+            self.assertIsNone(self.lookups.get_sla_config(self.finance.pk, 'low'))
+        self.assertIsNotNone(ticket.resolution_due_at)
+
+    def test_saves_and_deletes_invalidate(self):
+        self.assertEqual(self.lookups.get_sla_config(self.finance.pk, 'high').resolution_time_hours, 8)
+        self.config.resolution_time_hours = 12
+        self.config.save()
+        self.assertEqual(self.lookups.get_sla_config(self.finance.pk, 'high').resolution_time_hours, 12)
+
+        self.config.delete()
+        self.assertIsNone(self.lookups.get_sla_config(self.finance.pk, 'high'))
+
+        Department.objects.create(name='Library')
+        self.assertIn('Library', [department.name for department in self.lookups.departments()])
+
+    def test_reloads_after_another_process_saves(self):
+        sla_hours = self.lookups.get_department_by_name('Finance').sla_hours
+        with self.assertNumQueries(0):
+            self.lookups.get_department_by_name('Finance')
+        # Another process saved a department and bumped the stamp
+        Department.objects.filter(pk=self.finance.pk).update(sla_hours=sla_hours + 12)
+        LookupVersion.objects.filter(pk=1).update(version=F('version') + 1)
+        self.assertEqual(self.lookups.get_department_by_name('Finance').sla_hours, sla_hours)
+        with patch.object(self.lookups, 'CHECK_INTERVAL', 0):
+            self.assertEqual(self.lookups.get_department_by_name('Finance').sla_hours, sla_hours + 12)
+
+    def test_saves_bump_the_shared_version(self):
+        version = LookupVersion.objects.get(pk=1).version
+        self.config.save()
+        Department.objects.create(name='Library')
+        self.assertEqual(LookupVersion.objects.get(pk=1).version, version + 2)
+
+
+class BulkEscalateTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'adminpass')
+        self.students = [
+            User.objects.create_user(f'24020240010{n}', f'24020240010{n}@apollouniversity.edu.in', 'pass')
+            for n in range(2)
+        ]
+        self.finance, _ = Department.objects.get_or_create(name='Finance')
+        self.general, _ = Department.objects.get_or_create(name='General')
+        SLAConfig.objects.update_or_create(
+            department=self.general, priority='high',
+            defaults={'response_time_hours': 2, 'resolution_time_hours': 6, 'escalation_time_hours': 12},
+        )
+
+    def make_tickets(self, count, student, status='open'):
+        return [
+            Ticket.objects.create(
+                student=student, department=self.finance, subject=f'Ticket {n}',
+                description='My fee receipt was not generated.', priority='high', status=status,
+            )
+            for n in range(count)
+        ]
+
+    def test_bulk_escalate_moves_tickets_and_queues_digests(self):
+        from django.contrib.admin.models import LogEntry
+        from core.digests import flush_digests
+        from core.models import OutboundEmail
+        from .models import TicketUpdate
+        tickets = self.make_tickets(2, self.students[0]) + self.make_tickets(1, self.students[1])
+        self.make_tickets(1, self.students[0], status='resolved')
+
+        escalated = Ticket.objects.bulk_escalate(
+            Ticket.objects.filter(department=self.finance), self.admin, 'Backlog',
+        )
+
+        self.assertEqual(sorted(t.pk for t in escalated), sorted(t.pk for t in tickets))
+        for ticket in escalated:
+            self.assertEqual(ticket.status, 'escalated')
+            self.assertEqual(ticket.department, self.general)
+            self.assertEqual(ticket.original_department, self.finance)
+            self.assertEqual(ticket.escalated_by, self.admin)
+            self.assertEqual(ticket.resolution_due_at, ticket.created_at + timedelta(hours=6))
+        self.assertEqual(Ticket.objects.filter(department=self.finance).count(), 1)
+        self.assertEqual(TicketUpdate.objects.filter(ticket__in=escalated, is_internal=True).count(), 3)
+        self.assertEqual(LogEntry.objects.filter(change_message__contains='Backlog').count(), 3)
+        # Students are emailed straight away; admin inboxes get a digest later
+        self.assertEqual(
+            sorted(OutboundEmail.objects.values_list('recipient', flat=True)),
+            sorted([self.students[0].email, self.students[1].email]),
+        )
+        self.assertEqual(flush_digests(force=True), 2)
+        self.assertEqual(
+            sorted(OutboundEmail.objects.values_list('recipient', flat=True)),
+            sorted([
+                self.students[0].email, self.students[1].email,
+                'finance@apollouniversity.edu', 'general.support@apollouniversity.edu',
+            ]),
+        )
+
+    def test_escalates_in_batches(self):
+        from . import sla
+        from .models import TicketUpdate
+        tickets = self.make_tickets(5, self.students[0])
+        batches = []
+        in_batches = sla.in_batches
+
+        def small_batches(items):
+            for batch in in_batches(items, size=2):
+                batches.append(batch)
+                yield batch
+
+        with patch('Student.sla.in_batches', small_batches):
+            escalated = Ticket.objects.bulk_escalate(Ticket.objects.filter(department=self.finance), self.admin)
+
+        self.assertEqual([len(batch) for batch in batches], [2, 2, 1])
+        self.assertEqual(sorted(t.pk for t in escalated), sorted(t.pk for t in tickets))
+        self.assertEqual(TicketUpdate.objects.filter(ticket__in=escalated).count(), 5)
+
+    def test_query_count_does_not_grow_with_tickets(self):
+        counts = []
+        for size in (2, 6):
+            Ticket.objects.all().delete()
+            self.make_tickets(size, self.students[0])
+            with CaptureQueriesContext(connection) as queries:
+                Ticket.objects.bulk_escalate(Ticket.objects.filter(department=self.finance), self.admin)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+
+class SLAWatcherTest(TestCase):
+    def setUp(self):
+        from .watcher import SLAWatcher
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'adminpass')
+        self.student = User.objects.create_user('240202400100', '240202400100@apollouniversity.edu.in', 'pass')
+        self.finance, _ = Department.objects.get_or_create(name='Finance')
+        SLAConfig.objects.update_or_create(
+            department=self.finance, priority='high',
+            defaults={'response_time_hours': 4, 'resolution_time_hours': 8, 'escalation_time_hours': 24},
+        )
+        self.ticket = Ticket.objects.create(
+            student=self.student, department=self.finance, subject='Fee receipt missing',
+            description='My fee receipt was not generated.', priority='high',
+        )
+        self.watcher = SLAWatcher(self.admin)
+
+    def test_fires_breach_then_escalation_when_due(self):
+        start = timezone.now()
+        self.assertEqual(self.watcher.load(start), 1)
+        self.assertEqual(self.watcher.next_due(), self.ticket.response_due_at)
+        # Sleeps until the deadline, capped by the refresh interval
+        self.assertEqual(self.watcher.seconds_until_next(60, now=start), 60)
+        self.assertAlmostEqual(
+            self.watcher.seconds_until_next(10 ** 6, now=start),
+            (self.ticket.response_due_at - start).total_seconds(),
+        )
+
+        self.assertEqual(self.watcher.fire_due(start + timedelta(hours=3)), (0, 0))
+        self.assertEqual(self.watcher.fire_due(start + timedelta(hours=5)), (1, 0))
+        self.assertEqual(SLABreachLog.objects.get().breach_type, 'response')
+
+        self.watcher.refresh(start + timedelta(hours=5))
+        self.assertEqual(self.watcher.next_due(), self.ticket.escalation_due_at)
+        self.assertEqual(self.watcher.fire_due(start + timedelta(hours=25)), (0, 1))
+        self.ticket.refresh_from_db()
+        self.assertEqual(self.ticket.status, 'escalated')
+        self.assertIsNone(self.watcher.next_due())
+
+    def test_refresh_only_reads_changed_tickets(self):
+        Ticket.objects.filter(pk=self.ticket.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+        start = timezone.now()
+        self.watcher.load(start)
+        self.assertEqual(self.watcher.refresh(), 0)
+
+        self.ticket.status = 'resolved'
+        self.ticket.save()
+        self.assertEqual(self.watcher.refresh(), 1)
+        self.assertIsNone(self.watcher.next_due())
+        self.assertEqual(self.watcher.fire_due(start + timedelta(hours=30)), (0, 0))
+
+    def test_stale_schedule_is_rechecked_in_the_database(self):
+        start = timezone.now()
+        self.watcher.load(start)
+        # Resolved after the watcher loaded it, before a refresh
+        Ticket.objects.filter(pk=self.ticket.pk).update(status='resolved')
+        self.assertEqual(self.watcher.fire_due(start + timedelta(hours=30)), (0, 0))
+        self.assertFalse(SLABreachLog.objects.exists())
+
+    def test_locked_tickets_are_retried(self):
+        from .watcher import RETRY_DELAY
+        start = timezone.now()
+        self.watcher.load(start)
+        due = start + timedelta(hours=25)
+        # Another worker held the row lock, so nothing was recorded or escalated
+        with patch('Student.watcher.record_breaches', return_value=[]), \
+                patch.object(Ticket.objects, 'bulk_escalate', return_value=[]):
+            self.assertEqual(self.watcher.fire_due(due), (0, 0))
+        self.assertEqual(self.watcher.next_due(), due + RETRY_DELAY)
+        self.assertEqual(self.watcher.fire_due(due), (0, 0))
+        self.assertEqual(self.watcher.fire_due(due + RETRY_DELAY), (1, 1))
+
+    def test_command_once(self):
+        out = StringIO()
+        call_command('sla_watcher', '--once', stdout=out)
+        self.assertIn('Watching 1 open tickets', out.getvalue())
+
+
+class ConcurrentEscalationTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'adminpass')
+        self.student = User.objects.create_user('240202400100', '240202400100@apollouniversity.edu.in', 'pass')
+        self.finance, _ = Department.objects.get_or_create(name='Finance')
+        self.ticket = Ticket.objects.create(
+            student=self.student, department=self.finance, subject='Fee receipt missing',
+            description='My fee receipt was not generated.', priority='high',
+        )
+
+    def test_stale_copies_escalate_once(self):
+        from django.contrib.admin.models import LogEntry
+        from core.models import OutboundEmail
+        from .models import TicketUpdate
+        # Both the SLA checker and an admin request loaded the open ticket
+        checker_copy = Ticket.objects.get(pk=self.ticket.pk)
+        admin_copy = Ticket.objects.get(pk=self.ticket.pk)
+
+        self.assertTrue(checker_copy.escalate(self.admin, 'SLA breach'))
+        self.assertFalse(admin_copy.escalate(self.admin, 'Manual'))
+
+        self.assertEqual(admin_copy.status, 'escalated')
+        self.assertEqual(admin_copy.original_department, self.finance)
+        self.assertEqual(TicketUpdate.objects.filter(ticket=self.ticket).count(), 1)
+        self.assertEqual(LogEntry.objects.count(), 1)
+        self.assertEqual(OutboundEmail.objects.filter(recipient=self.student.email).count(), 1)
+
+    def test_resolved_meanwhile_is_not_escalated(self):
+        stale = Ticket.objects.get(pk=self.ticket.pk)
+        Ticket.objects.filter(pk=self.ticket.pk).update(status='resolved')
+        with self.assertRaises(Exception):
+            stale.escalate(self.admin, 'SLA breach')
+        self.ticket.refresh_from_db()
+        self.assertEqual(self.ticket.status, 'resolved')
+
+    def test_breaches_are_recorded_once(self):
+        from django.db import IntegrityError, transaction
+        from .sla import record_breaches
+        # Two workers found the same breach before either recorded it
+        breaches = {self.ticket.pk: 'resolution'}
+        self.assertEqual(len(record_breaches(breaches)), 1)
+        self.assertEqual(record_breaches(breaches), [])
+        self.assertEqual(SLABreachLog.objects.count(), 1)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            SLABreachLog.objects.create(ticket=self.ticket, breach_type='resolution')
+
+
+class TicketSearchTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('finance_admin', 'finance@example.com', 'adminpass')
+        self.student = User.objects.create_user('240202400100', '240202400100@apollouniversity.edu.in', 'pass')
+        self.finance, _ = Department.objects.get_or_create(name='Finance')
+        self.hostel, _ = Department.objects.get_or_create(name='Hostel')
+        self.admin.profile.is_admin = True
+        self.admin.profile.department = self.finance
+        self.admin.profile.must_change_password = False
+        self.admin.profile.save()
+
+        self.receipt = Ticket.objects.create(
+            student=self.student, department=self.finance, subject='Fee receipt missing',
+            description='Paid online last week.', priority='high',
+        )
+        self.refund = Ticket.objects.create(
+            student=self.student, department=self.finance, subject='Refund request',
+            description='Please send the receipt for my refund.', priority='low',
+        )
+        self.hostel_ticket = Ticket.objects.create(
+            student=self.student, department=self.hostel, subject='Receipt for hostel fee',
+            description='Need a copy.', priority='low',
+        )
+
+    def test_subject_matches_rank_first(self):
+        from .search import search_ticket_ids
+        ids = search_ticket_ids('receipt', Ticket.objects.filter(department=self.finance))
+        self.assertEqual(ids, [self.receipt.pk, self.refund.pk])
+
+    def test_prefix_and_stemmed_matches(self):
+        from .search import search_ticket_ids
+        self.assertEqual(search_ticket_ids('refu'), [self.refund.pk])
+        self.assertIn(self.receipt.pk, search_ticket_ids('paid online weeks'))
+        self.assertEqual(search_ticket_ids('"OR* ('), [])
+
+    def test_index_follows_edits_comments_and_deletes(self):
+        from .models import TicketUpdate
+        from .search import search_ticket_ids
+        self.assertEqual(search_ticket_ids('scholarship'), [])
+
+        update = TicketUpdate.objects.create(ticket=self.refund, user=self.admin, comment='Forwarded to scholarship cell')
+        self.assertEqual(search_ticket_ids('scholarship'), [self.refund.pk])
+        update.delete()
+        self.assertEqual(search_ticket_ids('scholarship'), [])
+
+        self.refund.subject = 'Scholarship refund'
+        self.refund.save(update_fields=['subject'])
+        self.assertEqual(search_ticket_ids('scholarship'), [self.refund.pk])
+
+        self.refund.delete()
+        self.assertEqual(search_ticket_ids('scholarship'), [])
+
+    def test_rebuild_command(self):
+        from .search import search_ticket_ids
+        Ticket.objects.filter(pk=self.refund.pk).update(subject='Library fine')
+        self.assertEqual(search_ticket_ids('library'), [])
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('Indexed 3 tickets', out.getvalue())
+        self.assertEqual(search_ticket_ids('library'), [self.refund.pk])
+
+    def test_view_is_scoped_to_department(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('dept_admin:search_tickets'), {'q': 'receipt'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['tickets'], [self.receipt, self.refund])
+
+        response = self.client.get(reverse('dept_admin:search_tickets'), {'q': 'hostel', 'format': 'json'})
+        self.assertEqual(response.json()['results'], [])
+
+
+    def test_admin_search_matches_in_a_subquery(self):
+        from django.contrib.admin.sites import AdminSite
+        from django.test import RequestFactory
+        from dept_admin.admin import TicketAdmin
+        model_admin = TicketAdmin(Ticket, AdminSite())
+        request = RequestFactory().get('/admin/Student/ticket/', {'q': 'receipt'})
+        queryset = Ticket.objects.filter(department=self.finance)
+
+        with self.assertNumQueries(0):
+            results, _ = model_admin.get_search_results(request, queryset, 'receipt')
+        self.assertEqual(set(results), {self.receipt, self.refund})
+        results, _ = model_admin.get_search_results(request, queryset, self.refund.ticket_id)
+        self.assertEqual(list(results), [self.refund])
+
+
+class AttachmentStorageTest(TestCase):
+    def setUp(self):
+        import shutil
+        import tempfile
+        from django.test import override_settings
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.finance, _ = Department.objects.get_or_create(name='Finance')
+        self.students = []
+        for username in ('240202400100', '240202400101'):
+            student = User.objects.create_user(username, f'{username}@apollouniversity.edu.in')
+            student.profile.must_change_password = False
+            student.profile.save()
+            self.students.append(student)
+
+    def submit(self, student, name, content):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        self.client.force_login(student)
+        return self.client.post(reverse('student:nt'), {
+            'department': self.finance.pk,
+            'subject': 'Fee receipt missing',
+            'description': 'My fee receipt was not generated.',
+            'attachment': SimpleUploadedFile(name, content, content_type='application/pdf'),
+        })
+
+    def test_same_content_is_stored_once(self):
+        import hashlib
+        from core.models import AttachmentBlob
+        from core.storage import attachment_storage
+        content = b'%PDF-1.4 fee receipt ' * 4000
+        self.submit(self.students[0], 'receipt.pdf', content)
+        self.submit(self.students[1], 'Fee Receipt (1).PDF', content)
+
+        first, second = Ticket.objects.order_by('id')
+        self.assertEqual(first.attachment.name, second.attachment.name)
+        self.assertEqual((first.attachment_name, second.attachment_name), ('receipt.pdf', 'Fee Receipt (1).PDF'))
+        blob = AttachmentBlob.objects.get()
+        self.assertEqual(blob.sha256, hashlib.sha256(content).hexdigest())
+        self.assertEqual(blob.ref_count, 2)
+        self.assertEqual(len(attachment_storage.listdir(f'blobs/{blob.sha256[:2]}')[1]), 1)
+
+        first.delete()
+        self.assertEqual(AttachmentBlob.objects.get().ref_count, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(AttachmentBlob.objects.exists())
+        self.assertFalse(attachment_storage.exists(blob.name))
+
+    def test_failed_save_does_not_leave_the_file_behind(self):
+        from django.core.files.base import ContentFile
+        from django.db import IntegrityError
+        from core.models import AttachmentBlob
+        from core.storage import attachment_storage
+        existing = Ticket.objects.create(
+            student=self.students[0], department=self.finance, subject='Fee receipt missing',
+            description='My fee receipt was not generated.',
+        )
+        ticket = Ticket(
+            student=self.students[1], department=self.finance, subject='Duplicate',
+            description='Same ticket id.', ticket_id=existing.ticket_id,
+            attachment=ContentFile(b'%PDF-1.4 hostel form', name='hostel_form.pdf'),
+        )
+        self.assertIsNone(ticket._saved_attachment)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(IntegrityError):
+                ticket.save()
+        self.assertFalse(AttachmentBlob.objects.exists())
+        self.assertFalse(attachment_storage.exists(ticket.attachment.name))
+
+    def test_only_ticket_submission_hashes_uploads(self):
+        from django.conf import settings
+        from core.uploads import HashedUploadedFile
+        # Bulk imports and admin uploads keep Django's handlers and size limits
+        self.assertNotIn('core.uploads.HashingUploadHandler', settings.FILE_UPLOAD_HANDLERS)
+        response = self.submit(self.students[0], 'receipt.pdf', b'%PDF-1.4 fee receipt')
+        self.assertEqual(response.status_code, 302)
+        self.assertIsInstance(response.wsgi_request.FILES['attachment'], HashedUploadedFile)
+
+    def test_oversized_upload_is_cut_off_and_rejected(self):
+        from django.test import override_settings
+        from core.models import AttachmentBlob
+        with override_settings(MAX_UPLOAD_SIZE=64 * 1024):
+            response = self.submit(self.students[0], 'hostel_form.pdf', b'x' * (256 * 1024))
+        self.assertEqual(response.status_code, 200)
+        upload = response.wsgi_request.FILES['attachment']
+        self.assertTrue(upload.truncated)
+        self.assertEqual(upload.size, 256 * 1024)
+        self.assertFalse(Ticket.objects.exists())
+        self.assertFalse(AttachmentBlob.objects.exists())
+
+        # Nothing past the limit reaches the disk
+        from core.uploads import HashingUploadHandler
+        with override_settings(MAX_UPLOAD_SIZE=64 * 1024):
+            handler = HashingUploadHandler()
+        handler.new_file('attachment', 'hostel_form.pdf', 'application/pdf', 256 * 1024)
+        for start in range(0, 256 * 1024, handler.chunk_size):
+            handler.receive_data_chunk(b'x' * handler.chunk_size, start)
+        upload = handler.file_complete(256 * 1024)
+        self.addCleanup(upload.close)
+        self.assertEqual(os.path.getsize(upload.temporary_file_path()), 64 * 1024)
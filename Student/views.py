@@ -17,7 +17,10 @@ from django.conf import settings
 
 from .forms import ComplaintForm, StudentRegistrationForm
 from core.models import Profile, Department
-from .models import Ticket, SLABreachLog
+from core.uploads import HashingUploadHandler
+from .models import Ticket, SLABreachLog, STATUS_CHOICES, PRIORITY_CHOICES
+from .stats import TicketStats, dashboard_days, rollup_metrics
+from core.pagination import paginate, wants_json, page_json_response
 from .decorators import student_required
 from dept_admin.utils import complete_student_registration
 from core.utils import generate_ticket_id, calculate_sla_due, send_student_email
@@ -79,8 +82,6 @@ def lp(request):
                 login(request, user)
                 # Rotate CSRF token on login
                 rotate_token(request)
-                # Ensure session is saved
-                request.session.save()
                 
                 # Check if password change is required
                 if user.profile.must_change_password:
@@ -147,7 +148,15 @@ from core.utils import generate_ticket_id, calculate_sla_due, send_student_email
 from .forms import ComplaintForm
 
 @login_required
+@csrf_exempt
 def nt(request):
+    # Attachments are hashed while they stream in; the handler has to be
+    # set before the CSRF check reads request.POST, hence csrf_protect below
+    request.upload_handlers = [HashingUploadHandler(request)]
+    return _nt(request)
+
+@csrf_protect
+def _nt(request):
     # Check if user is a superuser or staff member
     if request.user.is_superuser or request.user.is_staff:
         messages.error(request, 'Admin users cannot submit complaints. Please use a student account.')
@@ -173,9 +182,6 @@ def nt(request):
             request.session['ticket_id'] = ticket.ticket_id
             messages.success(request, f'Complaint submitted successfully! Ticket ID: {ticket.ticket_id}')
             
-            # Ensure user session is maintained
-            request.session.save()
-            
             # Redirect to student landing page
             return redirect('student:landingpage')
         else:
@@ -199,18 +205,15 @@ def landingpage(request):
     # Pop ticket_id from session so it only shows once
     ticket_id = request.session.pop('ticket_id', None)
 
-    total = Ticket.objects.filter(student=user).count()
-    pending = Ticket.objects.filter(student=user, status__in=['open', 'in_progress']).count()
-    resolved = Ticket.objects.filter(student=user, status='resolved').count()
-    escalated = Ticket.objects.filter(student=user, status='escalated').count()
+    stats = TicketStats.for_student(user, buckets=['total', 'pending', 'resolved', 'escalated'])
     recent_tickets = Ticket.objects.filter(student=user).order_by('-created_at')[:3]
 
     return render(request, 'landingpage.html', {
         'student_name': user.first_name or user.username,
-        'total': total,
-        'pending': pending,
-        'resolved': resolved,
-        'escalated': escalated,
+        'total': stats['total'],
+        'pending': stats['pending'],
+        'resolved': stats['resolved'],
+        'escalated': stats['escalated'],
         'recent_complaints': recent_tickets,
         'ticket_id': ticket_id,
     })
@@ -234,53 +237,19 @@ def student_root(request):
 @login_required
 def sla_dashboard(request):
     # Get date range (default: last 30 days)
-    days = int(request.GET.get('days', 30))
-    start_date = timezone.now() - timedelta(days=days)
+    days = dashboard_days(request)
     
-    # Overall metrics
-    total_tickets = Ticket.objects.filter(created_at__gte=start_date).count()
-    resolved_tickets = Ticket.objects.filter(
-        created_at__gte=start_date,
-        status='resolved'
-    ).count()
-    
-    # Calculate resolution rate
-    resolution_rate = (resolved_tickets / total_tickets * 100) if total_tickets > 0 else 0
-    
-    # Calculate average resolution time
-    avg_resolution_time = Ticket.objects.filter(
-        created_at__gte=start_date,
-        resolved_at__isnull=False
-    ).aggregate(
-        avg_time=Avg(
-            'resolved_at' - 'created_at'
-        )
-    )['avg_time']
-    
-    if avg_resolution_time:
-        avg_resolution_hours = avg_resolution_time.total_seconds() / 3600
-    else:
-        avg_resolution_hours = 0
+    # Overall metrics, summed from the daily rollup
+    overall = rollup_metrics(days)
+    total_tickets = overall['total_tickets']
+    resolution_rate = overall['resolution_rate']
+    avg_resolution_hours = overall['avg_resolution_hours']
     
     # Department-wise metrics
-    departments = Department.objects.all()
-    department_metrics = []
-    
-    for dept in departments:
-        dept_tickets = Ticket.objects.filter(
-            department=dept,
-            created_at__gte=start_date
-        )
-        
-        dept_total = dept_tickets.count()
-        if dept_total > 0:
-            dept_resolved = dept_tickets.filter(status='resolved').count()
-            
-            department_metrics.append({
-                'name': dept.name,
-                'total_tickets': dept_total,
-                'resolution_rate': (dept_resolved / dept_total * 100),
-            })
+    department_metrics = [
+        dict(row, name=row['department__name'])
+        for row in rollup_metrics(days, 'department__name', 'department')
+    ]
     
     context = {
         'total_tickets': total_tickets,
@@ -302,7 +271,7 @@ def vt(request):
     priority = request.GET.get('priority', '')
     
     # Base queryset
-    tickets = Ticket.objects.filter(student=user).order_by('-created_at')
+    tickets = Ticket.objects.filter(student=user).select_related('student', 'department')
     
     # Apply filters
     if status:
@@ -310,12 +279,17 @@ def vt(request):
     if priority:
         tickets = tickets.filter(priority=priority)
     
+    page = paginate(request, tickets)
+    if wants_json(request):
+        return page_json_response(page)
+    
     context = {
-        'tickets': tickets,
+        'tickets': page,
+        'stats': TicketStats(tickets, buckets=['total', 'pending', 'resolved']),
         'current_status': status,
         'current_priority': priority,
-        'status_choices': Ticket.STATUS_CHOICES,
-        'priority_choices': Ticket.PRIORITY_CHOICES,
+        'status_choices': STATUS_CHOICES,
+        'priority_choices': PRIORITY_CHOICES,
     }
     return render(request, 'viewtickets.html', context)
 
@@ -377,17 +351,19 @@ def new_ticket(request):
             return redirect('student:landingpage')
     else:
         form = ComplaintForm()
-        # Set department queryset to show only unique departments
-        form.fields['department'].queryset = Department.objects.all().order_by('name')
     
     return render(request, 'newticket.html', {'form': form})
 
 @login_required
 @student_required
 def view_tickets(request):
-    tickets = Ticket.objects.filter(student=request.user).order_by('-created_at')
+    tickets = Ticket.objects.filter(student=request.user).select_related('student', 'department')
+    page = paginate(request, tickets)
+    if wants_json(request):
+        return page_json_response(page)
     context = {
-        'tickets': tickets,
+        'tickets': page,
+        'stats': TicketStats(tickets, buckets=['total', 'pending', 'resolved']),
         'student_name': request.user.first_name or request.user.username
     }
     return render(request, 'viewtickets.html', context)
@@ -0,0 +1,195 @@
+"""
+Event-driven SLA checking for the ``sla_watcher`` daemon.
+
+Instead of rescanning every open ticket on a timer, the watcher keeps a
+min-heap of upcoming breach and escalation deadlines. Each cycle it reads
+only tickets whose ``updated_at`` moved past its watermark, reschedules
+them, fires whatever has fallen due (re-checked against the database) and
+sleeps until the next deadline or refresh, whichever comes first.
+"""
+import heapq
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Ticket
+from .sla import (
+    OPEN_STATUSES,
+    find_breached_ticket_ids,
+    find_escalatable_ticket_ids,
+    in_batches,
+    notify_breaches,
+    record_breaches,
+)
+
+logger = logging.getLogger(__name__)
+
+ESCALATION_REASON = "Automatic escalation due to SLA breach"
+
+# Changed rows are re-read this far behind the watermark so transactions
+# that committed late are not missed. Rescheduling a ticket is idempotent.
+OVERLAP = timedelta(seconds=getattr(settings, 'SLA_WATCHER_OVERLAP_SECONDS', 30))
+
+# Due tickets the database re-check did not act on (typically rows another
+# worker had locked) are retried this long after the failed attempt.
+RETRY_DELAY = timedelta(seconds=getattr(settings, 'SLA_WATCHER_RETRY_SECONDS', 30))
+
+WATCHED_FIELDS = [
+    'id', 'status', 'sla_breach', 'first_response_at',
+    'response_due_at', 'resolution_due_at', 'escalation_due_at',
+]
+
+
+class SLAWatcher:
+    """
+    In-memory schedule of SLA deadlines.
+
+    ``scheduled`` maps a ticket id to the ``(due_at, action)`` pairs that
+    are currently valid for it. Heap entries left over from before a ticket
+    changed are not removed eagerly; they are skipped when popped.
+    """
+
+    def __init__(self, system_user):
+        self.system_user = system_user
+        self.heap = []
+        self.scheduled = {}
+        self.watermark = None
+
+    def __len__(self):
+        return len(self.scheduled)
+
+    def load(self, now=None):
+        """Schedule every open ticket. Returns the number of tickets scheduled."""
+        now = now or timezone.now()
+        self.heap = []
+        self.scheduled = {}
+        rows = Ticket.objects.filter(status__in=OPEN_STATUSES).order_by().values(*WATCHED_FIELDS)
+        for row in rows.iterator(chunk_size=2000):
+            self.schedule(row)
+        self.watermark = now
+        return len(self)
+
+    def refresh(self, now=None):
+        """Reschedule tickets changed since the last refresh. Returns how many were read."""
+        if self.watermark is None:
+            return self.load(now)
+        now = now or timezone.now()
+        rows = list(
+            Ticket.objects.filter(updated_at__gte=self.watermark - OVERLAP).order_by().values(*WATCHED_FIELDS)
+        )
+        for row in rows:
+            self.schedule(row)
+        self.watermark = now
+        if len(self.heap) > 2 * len(self) + 1000:
+            self.compact()
+        return len(rows)
+
+    def schedule(self, row, not_before=None):
+        """
+        Replace the deadlines tracked for one ticket (a ``WATCHED_FIELDS``
+        dict). Deadlines earlier than ``not_before`` are deferred to it.
+        """
+        entries = set()
+        if row['status'] in OPEN_STATUSES:
+            if not row['sla_breach']:
+                # Mirrors find_breached_ticket_ids: whichever deadline comes first
+                breach_deadlines = [row['resolution_due_at']]
+                if row['first_response_at'] is None:
+                    breach_deadlines.append(row['response_due_at'])
+                breach_deadlines = [due for due in breach_deadlines if due is not None]
+                if breach_deadlines:
+                    entries.add((min(breach_deadlines), 'breach'))
+            if row['escalation_due_at'] is not None:
+                entries.add((row['escalation_due_at'], 'escalate'))
+
+        if not_before is not None:
+            entries = {(max(due_at, not_before), action) for due_at, action in entries}
+        if entries:
+            self.scheduled[row['id']] = entries
+            for due_at, action in entries:
+                heapq.heappush(self.heap, (due_at, row['id'], action))
+        else:
+            self.scheduled.pop(row['id'], None)
+
+    def compact(self):
+        self.heap = [
+            (due_at, ticket_id, action)
+            for ticket_id, entries in self.scheduled.items()
+            for due_at, action in entries
+        ]
+        heapq.heapify(self.heap)
+
+    def _is_current(self, entry):
+        due_at, ticket_id, action = entry
+        return (due_at, action) in self.scheduled.get(ticket_id, ())
+
+    def next_due(self):
+        """The earliest pending deadline, or None when nothing is scheduled."""
+        while self.heap and not self._is_current(self.heap[0]):
+            heapq.heappop(self.heap)
+        return self.heap[0][0] if self.heap else None
+
+    def pop_due(self, now):
+        """Remove and return ``(breach_ids, escalate_ids)`` whose deadline has passed."""
+        breach_ids, escalate_ids = set(), set()
+        while self.heap and self.heap[0][0] <= now:
+            entry = heapq.heappop(self.heap)
+            if not self._is_current(entry):
+                continue
+            due_at, ticket_id, action = entry
+            self.scheduled[ticket_id].discard((due_at, action))
+            if not self.scheduled[ticket_id]:
+                del self.scheduled[ticket_id]
+            (breach_ids if action == 'breach' else escalate_ids).add(ticket_id)
+        return breach_ids, escalate_ids
+
+    def fire_due(self, now=None):
+        """
+        Record breaches and escalate tickets whose deadlines have passed.
+        Candidates are re-checked in the database, so a ticket answered or
+        resolved since it was scheduled is left alone.
+        Returns ``(breaches, escalations)`` actually performed.
+        """
+        now = now or timezone.now()
+        breach_ids, escalate_ids = self.pop_due(now)
+
+        breach_logs = []
+        if breach_ids:
+            breach_logs = record_breaches(find_breached_ticket_ids(now, ids=breach_ids), now)
+            notify_breaches(breach_logs)
+
+        escalated = []
+        if escalate_ids:
+            escalated = Ticket.objects.bulk_escalate(
+                Ticket.objects.filter(id__in=find_escalatable_ticket_ids(now, ids=escalate_ids)),
+                self.system_user,
+                ESCALATION_REASON,
+            )
+
+        # Anything not acted on is rescheduled from its current row, so a
+        # ticket skipped because it was locked is not lost until it changes
+        unconfirmed = (breach_ids - {log.ticket_id for log in breach_logs}) | (
+            escalate_ids - {ticket.id for ticket in escalated}
+        )
+        if unconfirmed:
+            self.requeue(unconfirmed, now)
+
+        if breach_logs or escalated:
+            logger.info(f"SLA watcher recorded {len(breach_logs)} breaches and escalated {len(escalated)} tickets")
+        return len(breach_logs), len(escalated)
+
+    def requeue(self, ids, now):
+        """Reschedule ``ids`` from the database, retrying overdue deadlines after ``RETRY_DELAY``."""
+        for batch in in_batches(ids):
+            for row in Ticket.objects.filter(id__in=batch).order_by().values(*WATCHED_FIELDS):
+                self.schedule(row, not_before=now + RETRY_DELAY)
+
+    def seconds_until_next(self, refresh_interval, now=None):
+        """How long to sleep: until the next deadline, but at most ``refresh_interval``."""
+        now = now or timezone.now()
+        next_due = self.next_due()
+        if next_due is None:
+            return refresh_interval
+        return max(0, min(refresh_interval, (next_due - now).total_seconds()))
@@ -12,6 +12,9 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
+
+from .database import SQLITE_PRAGMAS, postgres_database, sqlite_database
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -52,11 +55,13 @@ AUTHENTICATION_BACKENDS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'core.middleware.SessionRefreshMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.UserProfileMiddleware',
     'core.middleware.ForcePasswordChangeMiddleware',
     'core.middleware.DisableHTTPSMiddleware',
 ]
@@ -85,12 +90,22 @@ WSGI_APPLICATION = 'TAU.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# SQLite by default (see TAU/database.py for the pragmas applied to every
+# connection); set DATABASE_URL=postgres://... to use PostgreSQL instead
+DATABASE_URL = os.getenv('DATABASE_URL')
+if DATABASE_URL:
+    DATABASES = {
+        'default': postgres_database(DATABASE_URL, conn_max_age=int(os.getenv('DB_CONN_MAX_AGE', 600))),
+    }
+else:
+    DATABASES = {
+        'default': sqlite_database(BASE_DIR / 'db.sqlite3'),
+    }
+    # Tests use a file too, so concurrency tests exercise real WAL locking;
+    # the pid keeps concurrent test runs on one host apart
+    DATABASES['default']['TEST'] = {
+        'NAME': os.path.join(tempfile.gettempdir(), f'tau_test_{os.getpid()}.sqlite3'),
     }
-}
 
 
 # Password validation
@@ -142,19 +157,32 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Attachment downloads (see core/downloads.py): 'accel' hands the transfer
+# to nginx with X-Accel-Redirect, 'sendfile' to Apache/lighttpd with
+# X-Sendfile; empty streams the file from Django
+ATTACHMENT_SENDFILE_BACKEND = os.getenv('ATTACHMENT_SENDFILE_BACKEND', '')
+ATTACHMENT_ACCEL_PREFIX = os.getenv('ATTACHMENT_ACCEL_PREFIX', '/protected-media/')
+
 # Maximum upload size (5MB)
 MAX_UPLOAD_SIZE = 5 * 1024 * 1024  # 5MB in bytes
 
-# File upload handlers
-FILE_UPLOAD_HANDLERS = [
-    'django.core.files.uploadhandler.MemoryFileUploadHandler',
-    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
-]
 
 # File upload permissions
 FILE_UPLOAD_PERMISSIONS = 0o644
 FILE_UPLOAD_DIRECTORY_PERMISSIONS = 0o755
 
+# Email outbox (see core/outbox.py and the process_outbox command)
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', 6))  # Dead-letter after this many failed sends
+OUTBOX_BACKOFF_SECONDS = 30  # First retry delay, doubled on every attempt
+OUTBOX_MAX_BACKOFF_SECONDS = 3600  # Upper bound for the retry delay
+OUTBOX_LEASE_SECONDS = 120  # A crashed worker's claimed email is retried after this
+# Admin-facing alerts are collected for this long and sent as one digest per inbox
+NOTIFICATION_DIGEST_WINDOW_SECONDS = int(os.getenv('NOTIFICATION_DIGEST_WINDOW_SECONDS', 300))
+
+# Daily SLA rollup (see Student/rollup.py and the refresh_sla_stats command)
+SLA_ROLLUP_OVERLAP_SECONDS = 300  # Re-read changes this far behind the last run
+SLA_WATCHER_OVERLAP_SECONDS = 30  # sla_watcher re-reads changed tickets this far behind its watermark
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -203,10 +231,39 @@ CSRF_COOKIE_AGE = None  # Cookie expires when browser closes
 SESSION_COOKIE_SECURE = IS_PRODUCTION  # Only send session cookie over HTTPS in production
 SESSION_COOKIE_HTTPONLY = True
 SESSION_COOKIE_SAMESITE = 'Lax'
-SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+# SESSION_BACKEND picks the store: 'cached_db' (reads served from the
+# 'sessions' cache, database written only when a session changes),
+# 'signed_cookies' (no server-side state), 'cache' or 'db'
+SESSION_BACKEND = os.getenv('SESSION_BACKEND', 'cached_db')
+SESSION_ENGINE = f'django.contrib.sessions.backends.{SESSION_BACKEND}'
+SESSION_CACHE_ALIAS = 'sessions'
 SESSION_COOKIE_AGE = 1209600  # 2 weeks
 SESSION_EXPIRE_AT_BROWSER_CLOSE = False
-SESSION_SAVE_EVERY_REQUEST = True
+# Sessions are saved only when modified; core.middleware.SessionRefreshMiddleware
+# re-saves an unchanged session once this old so the expiry keeps sliding
+SESSION_SAVE_EVERY_REQUEST = False
+SESSION_REFRESH_SECONDS = int(os.getenv('SESSION_REFRESH_SECONDS', 86400))
+
+# The session cache must be shared by every worker process, or a logout in
+# one worker leaves the session cached in the others: Redis when REDIS_URL
+# is set, otherwise a file cache shared by the workers on this host
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('REDIS_URL'),
+    } if os.getenv('REDIS_URL') else {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('SESSION_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'tau_sessions')),
+        'TIMEOUT': SESSION_COOKIE_AGE,
+    },
+}
+
+# Each process re-checks the shared LookupVersion stamp this often before
+# trusting its cached departments and SLA configurations (Student.lookups)
+LOOKUP_CACHE_CHECK_SECONDS = int(os.getenv('LOOKUP_CACHE_CHECK_SECONDS', 5))
 
 # Login URLs
 LOGIN_URL = 'student:loginn'
@@ -21,6 +21,7 @@ from django.conf.urls.static import static
 from django.shortcuts import redirect, render
 from django.http import HttpResponse
 from django.template import loader
+from core.views import ticket_attachment
 from dept_admin.admin_sites import (
     finance_admin_site,
     hostel_admin_site,
@@ -69,10 +70,12 @@ urlpatterns = [
     path('others-admin/', others_admin_site.urls, name='others_admin_site'),
     path('gatepass-admin/', gatepass_admin_site.urls, name='gatepass_admin_site'),
     path('choose-portal/', choose_portal, name='choose_portal'),
+    # Permission-checked attachment downloads (see core/downloads.py)
+    path('attachments/<int:ticket_id>/', ticket_attachment, name='ticket_attachment'),
 ]
 
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    # Media is not served here: attachments go through the permission-checked view
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
 
 handler403 = custom_403
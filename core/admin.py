@@ -6,8 +6,9 @@ from django.contrib.auth.admin import UserAdmin as DefaultUserAdmin
 from django.contrib.auth.forms import UserCreationForm
 from django import forms
 from django.db import transaction
+from django.utils import timezone
 
-from .models import Complaint, Department, Profile, AuditLog
+from .models import Complaint, Department, Profile, AuditLog, OutboundEmail
 
 class DepartmentFacultyCreationForm(UserCreationForm):
     department = forms.ModelChoiceField(queryset=Department.objects.all())
@@ -73,10 +74,9 @@ class BaseDepartmentAdminSite(AdminSite):
         return (
             request.user.is_active and
             request.user.is_staff and
-            hasattr(request.user, 'profile') and
-            request.user.profile.department and
-            request.user.profile.department.name == self.department_name and
-            request.user.profile.is_admin
+            request.department is not None and
+            request.department.name == self.department_name and
+            request.profile.is_admin
         )
 
     def each_context(self, request):
@@ -166,3 +166,17 @@ class AuditLogAdmin(admin.ModelAdmin):
     readonly_fields = ('complaint', 'performed_by', 'action', 'timestamp')
 
 admin.site.register(AuditLog, AuditLogAdmin)
+
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('recipient', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('recipient', 'subject')
+    readonly_fields = ('created_at', 'sent_at', 'last_error')
+    actions = ['retry_now']
+
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status='sent').update(status='pending', attempts=0, next_attempt_at=timezone.now())
+        self.message_user(request, f"{updated} emails re-queued.")
+    retry_now.short_description = 'Re-queue selected emails'
+
+admin.site.register(OutboundEmail, OutboundEmailAdmin)
@@ -0,0 +1,125 @@
+"""
+Brevo transactional email client.
+
+All requests go through one module-level ``requests.Session`` so the TCP
+and TLS connection to Brevo is pooled and kept alive between emails.
+Several emails can be sent in a single round-trip with ``send_batch``,
+which uses Brevo's ``messageVersions`` payload.
+"""
+import logging
+import os
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+API_URL = 'https://api.brevo.com/v3/smtp/email'
+
+# Brevo accepts at most this many message versions per request
+MAX_MESSAGE_VERSIONS = 1000
+
+# Rejections that apply to every message, so splitting the batch cannot help
+SPLIT_EXEMPT_STATUSES = {401, 403, 429}
+
+session = requests.Session()
+session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=10))
+session.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=10))
+
+
+class BrevoClient:
+    """Thin wrapper around Brevo's /v3/smtp/email endpoint."""
+
+    def __init__(self, api_key=None, api_url=None, sender=None, timeout=(5, 30), http=None):
+        self._api_key = api_key
+        self.api_url = api_url or getattr(settings, 'BREVO_API_URL', API_URL)
+        self.sender = sender or {
+            'name': getattr(settings, 'BREVO_SENDER_NAME', 'TEAM SITP'),
+            'email': getattr(settings, 'BREVO_SENDER_EMAIL', 'testcasemail019@gmail.com'),
+        }
+        self.timeout = timeout
+        self.http = http or session
+
+    @property
+    def api_key(self):
+        # Read lazily so the key can be provided after import
+        return self._api_key or os.getenv('BREVO_API_KEY')
+
+    def _post(self, payload, count):
+        """POST ``payload``. Returns Brevo's HTTP status, or None if no response was received."""
+        if not self.api_key:
+            logger.error("BREVO_API_KEY is not set; cannot send email")
+            return None
+        try:
+            response = self.http.post(
+                self.api_url,
+                headers={
+                    'accept': 'application/json',
+                    'api-key': self.api_key,
+                    'content-type': 'application/json',
+                },
+                json=payload,
+                timeout=self.timeout,
+            )
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Brevo request for {count} email(s) failed: {e}")
+            return None
+
+        if response.status_code == 201:
+            logger.info(f"Brevo accepted {count} email(s)")
+        else:
+            logger.error(f"Brevo rejected {count} email(s): HTTP {response.status_code} {response.text[:500]}")
+        return response.status_code
+
+    def send(self, subject, html, recipient):
+        """Send one email. Returns True if Brevo accepted it."""
+        return self._send_one(subject, html, recipient) == 201
+
+    def _send_one(self, subject, html, recipient):
+        return self._post({
+            'sender': self.sender,
+            'to': [{'email': recipient}],
+            'subject': subject,
+            'htmlContent': html,
+        }, count=1)
+
+    def send_batch(self, messages):
+        """
+        Send several ``(subject, html, recipient)`` emails in one request
+        using ``messageVersions``. Returns one True/False per message.
+
+        Brevo accepts or rejects a request as a whole, so when it refuses a
+        batch as invalid (a 4xx other than auth or rate limiting, e.g. one
+        malformed address) the batch is split in half and each half sent
+        again, until the bad messages are isolated and the rest delivered.
+        """
+        messages = list(messages)
+        if not messages:
+            return []
+        if len(messages) > MAX_MESSAGE_VERSIONS:
+            raise ValueError(f"At most {MAX_MESSAGE_VERSIONS} messages can be sent in one batch")
+
+        status = self._send_one(*messages[0]) if len(messages) == 1 else self._post_versions(messages)
+        if status == 201:
+            return [True] * len(messages)
+        if len(messages) > 1 and status is not None and 400 <= status < 500 and status not in SPLIT_EXEMPT_STATUSES:
+            middle = len(messages) // 2
+            return self.send_batch(messages[:middle]) + self.send_batch(messages[middle:])
+        return [False] * len(messages)
+
+    def _post_versions(self, messages):
+        first_subject, first_html, _ = messages[0]
+        return self._post({
+            'sender': self.sender,
+            # Top-level content is the default; every version overrides it
+            'subject': first_subject,
+            'htmlContent': first_html,
+            'messageVersions': [
+                {'to': [{'email': recipient}], 'subject': subject, 'htmlContent': html}
+                for subject, html, recipient in messages
+            ],
+        }, count=len(messages))
+
+
+client = BrevoClient()
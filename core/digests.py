@@ -0,0 +1,99 @@
+"""
+Coalescing of admin-facing ticket alerts into digests.
+
+SLA breach and escalation alerts for department and general-support
+inboxes are buffered as PendingNotification rows instead of being queued
+one email per ticket. ``flush_digests`` (run by ``process_outbox``) turns
+every inbox whose oldest alert has waited ``DIGEST_WINDOW`` into a single
+outbox email listing all affected tickets. Student-facing mail does not
+go through here and is still queued immediately.
+"""
+import logging
+from datetime import timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from .emails import render_batch
+from .models import PendingNotification
+from .outbox import queue_emails
+
+logger = logging.getLogger(__name__)
+
+DIGEST_WINDOW = timedelta(seconds=getattr(settings, 'NOTIFICATION_DIGEST_WINDOW_SECONDS', 300))
+
+
+def buffer_notification(recipient, kind, ticket, detail=''):
+    """Hold an admin alert about ``ticket`` for the next digest to ``recipient``."""
+    return PendingNotification.objects.create(
+        recipient=recipient, kind=kind, ticket=ticket, detail=detail or '',
+    )
+
+
+def buffer_notifications(notifications):
+    """Buffer several ``(recipient, kind, ticket, detail)`` alerts with one bulk insert."""
+    return PendingNotification.objects.bulk_create([
+        PendingNotification(recipient=recipient, kind=kind, ticket=ticket, detail=detail or '')
+        for recipient, kind, ticket, detail in notifications
+    ])
+
+
+def due_recipients(now=None):
+    """Inboxes whose oldest buffered alert has waited out the digest window."""
+    now = now or timezone.now()
+    return PendingNotification.objects.values('recipient').annotate(
+        oldest=Min('created_at'),
+    ).filter(oldest__lte=now - DIGEST_WINDOW).values_list('recipient', flat=True)
+
+
+def digest_subject(notifications):
+    counts = {}
+    for notification in notifications:
+        label = notification.get_kind_display()
+        counts[label] = counts.get(label, 0) + 1
+    summary = ', '.join(f"{count} {label}" for label, count in counts.items())
+    return f"Ticket Alerts Digest: {summary}"
+
+
+def flush_digests(now=None, force=False):
+    """
+    Queue one digest email per due inbox and drop the alerts it covers.
+    Repeated alerts for the same ticket and kind are listed once. With
+    ``force`` every buffered alert is flushed regardless of age.
+    Returns the number of digests queued.
+    """
+    pending = PendingNotification.objects.all()
+    if not force:
+        pending = pending.filter(recipient__in=list(due_recipients(now)))
+
+    with transaction.atomic():
+        notifications = list(
+            pending.select_for_update().select_related(
+                'ticket', 'ticket__department', 'ticket__original_department',
+            ).order_by('recipient', 'created_at')
+        )
+        if not notifications:
+            return 0
+
+        recipients, contexts = [], []
+        for recipient, group in groupby(notifications, key=lambda n: n.recipient):
+            seen = set()
+            alerts = []
+            for notification in group:
+                if (notification.kind, notification.ticket_id) not in seen:
+                    seen.add((notification.kind, notification.ticket_id))
+                    alerts.append(notification)
+            recipients.append((digest_subject(alerts), recipient))
+            contexts.append({'notifications': alerts})
+
+        bodies = render_batch('core/emails/admin_digest.html', contexts)
+        queue_emails(
+            (subject, html, recipient) for (subject, recipient), html in zip(recipients, bodies)
+        )
+        PendingNotification.objects.filter(pk__in=[n.pk for n in notifications]).delete()
+
+    logger.info(f"Queued {len(recipients)} alert digests covering {len(notifications)} notifications")
+    return len(recipients)
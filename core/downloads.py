@@ -0,0 +1,110 @@
+"""
+Serving of stored files without tying up a worker for the transfer.
+
+``ATTACHMENT_SENDFILE_BACKEND`` chooses who sends the bytes once the view
+has checked permissions:
+
+* ``'accel'``: nginx, via ``X-Accel-Redirect`` to an ``internal`` location
+  mapped to MEDIA_ROOT at ``ATTACHMENT_ACCEL_PREFIX``.
+* ``'sendfile'``: Apache mod_xsendfile or lighttpd, via ``X-Sendfile``.
+* anything else: Django, as a FileResponse. gunicorn sends it with
+  ``os.sendfile`` through ``wsgi.file_wrapper``. Single ``Range`` requests
+  are answered with 206 Partial Content.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.http import content_disposition_header
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class FileRange:
+    """
+    Read-only view of ``length`` bytes of ``file`` starting at ``start``.
+    ``fileno`` is passed through so a server's sendfile path still applies;
+    gunicorn sends from the current offset for Content-Length bytes.
+    """
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """``(start, end)`` (inclusive) for a single-range header, None to send everything, or ValueError."""
+    match = RANGE_RE.match(header.strip()) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        start, end = max(0, size - int(last)), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def serve_file(request, storage, name, filename, as_attachment=True):
+    """Respond with the stored file ``name``, downloaded as ``filename``."""
+    backend = getattr(settings, 'ATTACHMENT_SENDFILE_BACKEND', '')
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    if backend in ('accel', 'sendfile'):
+        response = HttpResponse(content_type=content_type)
+        if backend == 'accel':
+            prefix = getattr(settings, 'ATTACHMENT_ACCEL_PREFIX', '/protected-media/')
+            response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(name)
+        else:
+            response['X-Sendfile'] = storage.path(name)
+        response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+        return response
+
+    try:
+        file = storage.open(name, 'rb')
+    except FileNotFoundError:
+        raise Http404("No attachment found")
+    size = storage.size(name)
+    try:
+        byte_range = parse_range(request.headers.get('Range'), size)
+    except ValueError:
+        file.close()
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if byte_range is None:
+        response = FileResponse(file, as_attachment=as_attachment, filename=filename, content_type=content_type)
+    else:
+        start, end = byte_range
+        response = FileResponse(
+            FileRange(file, start, end - start + 1),
+            as_attachment=as_attachment, filename=filename, content_type=content_type, status=206,
+        )
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    return response
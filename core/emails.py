@@ -0,0 +1,21 @@
+"""
+Rendering of HTML notification emails from Django templates.
+
+Templates live under ``templates/core/emails/`` (and app equivalents) and
+extend ``core/emails/base.html``, which holds the shared layout and CSS.
+The template engine's cached loader compiles each template once per
+process; ``render_batch`` additionally resolves it once per batch, so
+rendering N emails only pays for N context renders.
+"""
+from django.template.loader import get_template
+
+
+def render_email(template_name, context):
+    """Render a single email body."""
+    return get_template(template_name).render(context)
+
+
+def render_batch(template_name, contexts):
+    """Render one email body per context with the same compiled template."""
+    template = get_template(template_name)
+    return [template.render(context) for context in contexts]
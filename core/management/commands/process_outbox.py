@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.digests import flush_digests
+from core.outbox import process_outbox
+
+
+class Command(BaseCommand):
+    help = ('Fold due admin alerts into digests and deliver queued emails from the outbox, '
+            'retrying failures with exponential backoff')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50,
+                            help='Maximum number of emails to deliver per batch')
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep running and poll the outbox instead of exiting when it is empty')
+        parser.add_argument('--interval', type=float, default=5,
+                            help='Seconds to sleep between polls when the outbox is empty (with --loop)')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        total_sent = total_failed = 0
+
+        while True:
+            digests = flush_digests()
+            if digests:
+                self.stdout.write(f'Queued {digests} alert digests')
+            sent, failed = process_outbox(batch_size=batch_size)
+            total_sent += sent
+            total_failed += failed
+            if sent or failed:
+                self.stdout.write(f'Delivered {sent} emails, {failed} failed')
+
+            if sent + failed < batch_size:
+                # Outbox drained (or only future retries left)
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+                close_old_connections()
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Outbox processed: {total_sent} sent, {total_failed} failed')
+        )
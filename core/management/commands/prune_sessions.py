@@ -0,0 +1,46 @@
+import time
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+# Engines that keep a row per session in django_session
+DB_ENGINES = (
+    'django.contrib.sessions.backends.db',
+    'django.contrib.sessions.backends.cached_db',
+)
+
+
+class Command(BaseCommand):
+    help = ('Delete expired sessions from the database in small batches, so the '
+            'write lock is released between batches instead of held for one big DELETE')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Maximum number of sessions deleted per batch')
+        parser.add_argument('--pause', type=float, default=0,
+                            help='Seconds to sleep between batches')
+
+    def handle(self, *args, **options):
+        if settings.SESSION_ENGINE not in DB_ENGINES:
+            self.stdout.write(f'{settings.SESSION_ENGINE} does not store sessions in the database; nothing to prune')
+            return
+
+        now = timezone.now()
+        batch_size = options['batch_size']
+        total = 0
+        while True:
+            keys = list(
+                Session.objects.filter(expire_date__lt=now).values_list('session_key', flat=True)[:batch_size]
+            )
+            if not keys:
+                break
+            deleted, _ = Session.objects.filter(session_key__in=keys).delete()
+            total += deleted
+            if len(keys) < batch_size:
+                break
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        self.stdout.write(self.style.SUCCESS(f'Pruned {total} expired sessions'))
@@ -1,7 +1,77 @@
+import time
+
+from django.conf import settings
 from django.shortcuts import redirect
 from django.urls import reverse
 from django.contrib.auth import logout
 from django.contrib import messages
+from django.contrib.auth.models import User
+
+from .models import Profile
+
+
+def load_profile(user):
+    """
+    Return ``user``'s profile with its department, or None. The profile is
+    fetched with one select_related query and cached on ``user``, so later
+    ``user.profile.department`` lookups in the request are free.
+    """
+    if not user.is_authenticated:
+        return None
+    if not User.profile.is_cached(user):
+        profile = Profile.objects.select_related('department').filter(user=user).first()
+        if profile is None:
+            # Cache the miss too, so hasattr(user, 'profile') does not query again
+            User.profile.related.set_cached_value(user, None)
+        else:
+            user.profile = profile
+    return getattr(user, 'profile', None)
+
+
+class UserProfileMiddleware:
+    """
+    Attach the logged-in user's profile and department to the request as
+    ``request.profile`` and ``request.department`` (None for anonymous users
+    or users without a profile).
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.profile = load_profile(request.user)
+        request.department = request.profile.department if request.profile else None
+        return self.get_response(request)
+
+
+class SessionRefreshMiddleware:
+    """
+    Sliding session expiry without a session write on every request.
+
+    Sessions are only saved when modified (SESSION_SAVE_EVERY_REQUEST is
+    off). This touches an unchanged session once it was last saved more
+    than SESSION_REFRESH_SECONDS ago, which makes SessionMiddleware save it
+    and push its expiry forward. Must sit below SessionMiddleware.
+    """
+    REFRESHED_AT_KEY = '_refreshed_at'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.refresh_seconds = getattr(settings, 'SESSION_REFRESH_SECONDS', 86400)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        session = getattr(request, 'session', None)
+        # Anonymous visitors without a session keep not having one
+        if session is None or session.session_key is None or session.get_expire_at_browser_close():
+            return response
+        if session.modified or time.time() - session.get(self.REFRESHED_AT_KEY, 0) >= self.refresh_seconds:
+            self.stamp(session)
+        return response
+
+    @classmethod
+    def stamp(cls, session):
+        session[cls.REFRESHED_AT_KEY] = int(time.time())
+
 
 class DisableHTTPSMiddleware:
     def __init__(self, get_response):
@@ -31,7 +101,7 @@ class ForcePasswordChangeMiddleware:
 
     def __call__(self, request):
         if request.user.is_authenticated and not request.user.is_staff:
-            profile = getattr(request.user, 'profile', None)
+            profile = request.profile
             
             # Check if user has a valid profile
             if not profile:
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:59
+
+import re
+
+from django.db import migrations, models
+
+
+def seed_sequences(apps, schema_editor):
+    """Start each sequence after the highest numeric ID already issued."""
+    Ticket = apps.get_model('Student', 'Ticket')
+    Complaint = apps.get_model('core', 'Complaint')
+    IdSequence = apps.get_model('core', 'IdSequence')
+
+    last_values = {}
+    sources = [
+        (Ticket, re.compile(r'^(AU-\d{4}-\w{3})-(\d+)$'), '{}'),
+        (Complaint, re.compile(r'^(\w{3})-(\d+)$'), 'complaint-{}'),
+    ]
+    for model, pattern, scope_format in sources:
+        for ticket_id in model.objects.values_list('ticket_id', flat=True).iterator():
+            match = pattern.match(ticket_id or '')
+            if match:
+                scope = scope_format.format(match.group(1))
+                last_values[scope] = max(last_values.get(scope, 0), int(match.group(2)))
+
+    IdSequence.objects.bulk_create([
+        IdSequence(scope=scope, last_value=value) for scope, value in last_values.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_outboundemail'),
+        ('Student', '0017_ticket_access_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=50, unique=True)),
+                ('last_value', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:08
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Student', '0017_ticket_access_indexes'),
+        ('core', '0013_idsequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipient', models.EmailField(max_length=254)),
+                ('kind', models.CharField(choices=[('sla_breach', 'SLA Breach'), ('escalation', 'Escalation')], max_length=20)),
+                ('detail', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('ticket', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='Student.ticket')),
+            ],
+            options={
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['recipient', 'created_at'], name='core_pendin_recipie_025d08_idx')],
+            },
+        ),
+    ]
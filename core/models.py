@@ -60,16 +60,8 @@ class Complaint(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.ticket_id:
-            prefix = self.department.name[:3].upper()
-            latest = Complaint.objects.filter(department=self.department).order_by('-id').first()
-            next_id = 1
-            if latest and latest.ticket_id:
-                try:
-                    last_num = int(latest.ticket_id.split('-')[-1])
-                    next_id = last_num + 1
-                except ValueError:
-                    pass
-            self.ticket_id = f"{prefix}-{next_id:04d}"
+            from .sequences import next_complaint_id
+            self.ticket_id = next_complaint_id(self.department.name)
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -83,3 +75,81 @@ class AuditLog(models.Model):
 
     def __str__(self):
         return f"Audit: {self.action} on {self.complaint.ticket_id} by {self.performed_by}"
+
+class OutboundEmail(models.Model):
+    """An email waiting to be delivered by the ``process_outbox`` worker."""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('dead', 'Dead Letter'),
+    ]
+
+    recipient = models.EmailField()
+    subject = models.CharField(max_length=255)
+    html_body = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    # When the worker may (re)try this email; also the lease expiry while sending
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.subject} -> {self.recipient} ({self.status})"
+
+    class Meta:
+        ordering = ['next_attempt_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+class PendingNotification(models.Model):
+    """
+    An admin-facing ticket alert held back so it can be folded into a
+    single digest per recipient (see core/digests.py).
+    """
+    KIND_CHOICES = [
+        ('sla_breach', 'SLA Breach'),
+        ('escalation', 'Escalation'),
+    ]
+
+    recipient = models.EmailField()
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    ticket = models.ForeignKey('Student.Ticket', on_delete=models.CASCADE, related_name='+')
+    detail = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.ticket_id} -> {self.recipient}"
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['recipient', 'created_at']),
+        ]
+
+class IdSequence(models.Model):
+    """Counter behind human-readable IDs, one row per scope such as 'AU-2025-FIN'."""
+    scope = models.CharField(max_length=50, unique=True)
+    last_value = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.scope}: {self.last_value}"
+
+
+class AttachmentBlob(models.Model):
+    """
+    One stored attachment file, shared by every ticket that uploaded the
+    same bytes. ``ref_count`` is the number of tickets pointing at it; the
+    file is deleted when it drops to zero (see core/storage.py).
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} refs)"
@@ -0,0 +1,126 @@
+"""
+DB-backed outbox for transactional email.
+
+Views queue emails with ``queue_email`` inside their own transaction and
+return immediately; the ``process_outbox`` management command delivers
+them through Brevo in batches with retries, exponential backoff and
+dead-lettering.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from . import brevo
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = getattr(settings, 'OUTBOX_MAX_ATTEMPTS', 6)
+BACKOFF_SECONDS = getattr(settings, 'OUTBOX_BACKOFF_SECONDS', 30)
+MAX_BACKOFF_SECONDS = getattr(settings, 'OUTBOX_MAX_BACKOFF_SECONDS', 3600)
+# How long a worker owns a claimed email before another worker may retry it
+LEASE_SECONDS = getattr(settings, 'OUTBOX_LEASE_SECONDS', 120)
+
+
+def queue_email(subject, message, recipient_email):
+    """Queue an HTML email for delivery by the outbox worker."""
+    return OutboundEmail.objects.create(
+        recipient=recipient_email,
+        subject=subject,
+        html_body=message,
+    )
+
+
+def queue_emails(messages):
+    """Queue several ``(subject, html, recipient)`` emails with one bulk insert."""
+    return OutboundEmail.objects.bulk_create([
+        OutboundEmail(recipient=recipient, subject=subject, html_body=html)
+        for subject, html, recipient in messages
+    ])
+
+
+def backoff_delay(attempts):
+    """Delay before retry number ``attempts`` (1-based): 30s, 60s, 120s, ..."""
+    return timedelta(seconds=min(BACKOFF_SECONDS * 2 ** (attempts - 1), MAX_BACKOFF_SECONDS))
+
+
+def due_emails(now=None):
+    """Pending emails whose retry time has come, plus sends whose lease expired."""
+    now = now or timezone.now()
+    return OutboundEmail.objects.filter(
+        status__in=['pending', 'sending'],
+        next_attempt_at__lte=now,
+    ).order_by('next_attempt_at')
+
+
+def claim(email, now=None):
+    """
+    Atomically take ownership of ``email`` for one delivery attempt.
+
+    The conditional UPDATE only matches if nobody else claimed the row since
+    it was read, so several workers can drain the same outbox safely.
+    """
+    now = now or timezone.now()
+    claimed = OutboundEmail.objects.filter(
+        pk=email.pk,
+        status=email.status,
+        attempts=email.attempts,
+    ).update(
+        status='sending',
+        attempts=F('attempts') + 1,
+        next_attempt_at=now + timedelta(seconds=LEASE_SECONDS),
+    )
+    if claimed:
+        email.refresh_from_db()
+    return bool(claimed)
+
+
+def record_attempt(email, sent, error=''):
+    """Apply the outcome of a delivery attempt to a claimed email (unsaved)."""
+    now = timezone.now()
+    if sent:
+        email.status = 'sent'
+        email.sent_at = now
+        email.last_error = ''
+    elif email.attempts >= MAX_ATTEMPTS:
+        email.status = 'dead'
+        email.last_error = error
+        logger.error(f"Giving up on email {email.pk} to {email.recipient} after {email.attempts} attempts: {error}")
+    else:
+        email.status = 'pending'
+        email.next_attempt_at = now + backoff_delay(email.attempts)
+        email.last_error = error
+        logger.warning(f"Email {email.pk} to {email.recipient} failed (attempt {email.attempts}), retrying at {email.next_attempt_at}")
+
+
+def process_outbox(batch_size=50, client=None):
+    """
+    Claim up to ``batch_size`` due emails and deliver them to Brevo in a
+    single batched request. Only the emails Brevo refused are retried.
+    Returns a ``(sent, failed)`` tuple.
+    """
+    client = client or brevo.client
+    batch_size = min(batch_size, brevo.MAX_MESSAGE_VERSIONS)
+
+    claimed = [email for email in list(due_emails()[:batch_size]) if claim(email)]
+    if not claimed:
+        return 0, 0
+
+    try:
+        results = client.send_batch([
+            (email.subject, email.html_body, email.recipient) for email in claimed
+        ])
+        error = 'Brevo API rejected the email'
+    except Exception as e:
+        results = [False] * len(claimed)
+        error = str(e)
+
+    for email, sent in zip(claimed, results):
+        record_attempt(email, sent, error)
+    OutboundEmail.objects.bulk_update(claimed, ['status', 'sent_at', 'next_attempt_at', 'last_error'])
+
+    sent = sum(1 for result in results if result)
+    return sent, len(claimed) - sent
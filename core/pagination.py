@@ -0,0 +1,132 @@
+"""
+Keyset (cursor) pagination for newest-first ticket lists.
+
+Pages are ordered by ``(field DESC NULLS LAST, id DESC)`` and the cursor
+holds the last row's key, so fetching any page is an index range scan of
+``page_size + 1`` rows no matter how deep into the history it is.
+"""
+import base64
+import json
+
+from django.db.models import F, Q
+from django.http import JsonResponse
+from django.utils.dateparse import parse_datetime
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+# Ticket attributes included in JSON pages
+TICKET_FIELDS = [
+    'id', 'ticket_id', 'subject', 'status', 'priority', 'created_at',
+    'escalated_at', 'resolved_at', 'student.username', 'department.name',
+]
+
+
+def encode_cursor(value, pk):
+    raw = json.dumps([value.isoformat() if value is not None else None, pk])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Return ``(value, pk)`` from a cursor, or None if it is malformed."""
+    try:
+        value, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        value = parse_datetime(value) if value is not None else None
+        return value, int(pk)
+    except (ValueError, TypeError):
+        return None
+
+
+class KeysetPage:
+    """One page of results plus the cursor and query string for the next one."""
+
+    def __init__(self, items, next_cursor=None, is_first=True):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.is_first = is_first
+        self.next_url = None
+        self.first_url = None
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __bool__(self):
+        return bool(self.items)
+
+
+def keyset_page(queryset, field='created_at', cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """Fetch the page of ``queryset`` that follows ``cursor`` (the first page if None)."""
+    queryset = queryset.order_by(F(field).desc(nulls_last=True), '-id')
+
+    key = decode_cursor(cursor) if cursor else None
+    if key:
+        value, pk = key
+        if value is None:
+            # Already in the trailing NULLs; only lower ids remain
+            queryset = queryset.filter(**{f'{field}__isnull': True, 'id__lt': pk})
+        else:
+            queryset = queryset.filter(
+                Q(**{f'{field}__lt': value})
+                | Q(**{field: value, 'id__lt': pk})
+                | Q(**{f'{field}__isnull': True})
+            )
+
+    items = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, field), last.pk)
+    return KeysetPage(items, next_cursor, is_first=key is None)
+
+
+def paginate(request, queryset, field='created_at'):
+    """
+    Keyset-paginate ``queryset`` using the request's ``?cursor=`` and
+    ``?page_size=`` parameters. Other query parameters (filters) are kept
+    in the page's ``next_url`` and ``first_url``.
+    """
+    try:
+        page_size = int(request.GET.get('page_size', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        page_size = DEFAULT_PAGE_SIZE
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+
+    page = keyset_page(queryset, field, request.GET.get('cursor'), page_size)
+
+    params = request.GET.copy()
+    params.pop('cursor', None)
+    params.pop('format', None)
+    page.first_url = f'?{params.urlencode()}' if params else '?'
+    if page.has_next:
+        params['cursor'] = page.next_cursor
+        page.next_url = f'?{params.urlencode()}'
+    return page
+
+
+def wants_json(request):
+    return request.GET.get('format') == 'json'
+
+
+def page_json_response(page, fields=TICKET_FIELDS):
+    """
+    Serialise ``page`` for infinite scroll. ``fields`` are attribute paths
+    such as ``'ticket_id'`` or ``'student.username'``.
+    """
+    def resolve(obj, path):
+        for attr in path.split('.'):
+            obj = getattr(obj, attr, None) if obj is not None else None
+        return obj.isoformat() if hasattr(obj, 'isoformat') else obj
+
+    return JsonResponse({
+        'results': [{path: resolve(item, path) for path in fields} for item in page],
+        'next_cursor': page.next_cursor,
+        'next_url': f'{page.next_url}&format=json' if page.next_url else None,
+    })
@@ -0,0 +1,44 @@
+"""
+Sequence-backed generators for ticket and complaint IDs.
+
+Each scope (e.g. ``AU-2025-FIN``) has one IdSequence row. Taking a value is
+a single ``UPDATE ... SET last_value = last_value + 1`` whose row lock is
+held until the surrounding transaction ends, so concurrent submissions get
+unique, increasing numbers without counting or scanning existing rows.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import IdSequence
+
+
+def next_value(scope):
+    """Atomically increment and return the counter for ``scope``."""
+    with transaction.atomic():
+        if not IdSequence.objects.filter(scope=scope).update(last_value=F('last_value') + 1):
+            try:
+                # Savepoint, so a concurrent first insert only rolls back this step
+                with transaction.atomic():
+                    IdSequence.objects.create(scope=scope, last_value=1)
+                return 1
+            except IntegrityError:
+                IdSequence.objects.filter(scope=scope).update(last_value=F('last_value') + 1)
+        return IdSequence.objects.values_list('last_value', flat=True).get(scope=scope)
+
+
+def department_code(department_name):
+    return department_name[:3].upper()
+
+
+def next_ticket_id(department_name, year=None):
+    """Next ticket ID for a department, e.g. ``AU-2025-FIN-0042``."""
+    year = year or timezone.now().year
+    scope = f'AU-{year}-{department_code(department_name)}'
+    return f'{scope}-{next_value(scope):04d}'
+
+
+def next_complaint_id(department_name):
+    """Next legacy complaint ID for a department, e.g. ``FIN-0042``."""
+    code = department_code(department_name)
+    return f'{code}-{next_value(f"complaint-{code}"):04d}'
@@ -1,6 +1,10 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
 from django.db.models.signals import post_save
 from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_logged_in
 from django.dispatch import receiver
+from .middleware import SessionRefreshMiddleware
 from .models import Profile
 
 @receiver(post_save, sender=User)
@@ -15,4 +19,17 @@ def create_profile(sender, instance, created, **kwargs):
 @receiver(post_save, sender=User)
 def save_profile(sender, instance, **kwargs):
     if hasattr(instance, 'profile'):
-        instance.profile.save()
\ No newline at end of file
+        instance.profile.save()
+
+@receiver(user_logged_in)
+def stamp_session(sender, request, user, **kwargs):
+    # login() saves the session anyway; start its refresh clock there
+    if hasattr(request, 'session'):
+        SessionRefreshMiddleware.stamp(request.session)
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            for pragma, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+                cursor.execute(f'PRAGMA {pragma} = {value}')
@@ -0,0 +1,104 @@
+"""
+Content-addressed, deduplicated storage for ticket attachments.
+
+Files are stored once under their SHA-256, as ``blobs/ab/<sha256><ext>``,
+no matter how many tickets upload them. Each stored file has an
+AttachmentBlob row whose ``ref_count`` the Ticket signals keep current
+through ``acquire_blob``/``release_blob``; the file is deleted together
+with its last reference. Files stored before this scheme (no blob row)
+are left alone.
+"""
+import hashlib
+import os
+
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+
+from .models import AttachmentBlob
+
+BLOB_DIR = 'blobs'
+
+
+def content_sha256(content):
+    """SHA-256 of a file, reusing the digest HashingUploadHandler computed while streaming."""
+    digest = getattr(content, 'sha256', None)
+    if digest:
+        return digest
+    hasher = hashlib.sha256()
+    for chunk in content.chunks():
+        hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def blob_name(digest, extension=''):
+    return f'{BLOB_DIR}/{digest[:2]}/{digest}{extension.lower()}'
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    def _save(self, name, content):
+        digest = content_sha256(content)
+        name = blob_name(digest, os.path.splitext(name)[1])
+        with transaction.atomic():
+            # The row lock is held until the ticket save that counts the new
+            # reference commits, so a concurrent release cannot delete the
+            # file in between (Ticket.save runs both in one transaction)
+            blob = AttachmentBlob.objects.select_for_update().filter(sha256=digest).first()
+            if blob is not None and self.exists(blob.name):
+                # Already stored; the new reference is counted when the ticket saves
+                return blob.name
+
+        name = super()._save(name, content)
+        try:
+            with transaction.atomic():
+                blob, _ = AttachmentBlob.objects.get_or_create(
+                    sha256=digest, defaults={'name': name, 'size': content.size},
+                )
+        except IntegrityError:
+            blob = AttachmentBlob.objects.get(sha256=digest)
+        if blob.name != name:
+            # A concurrent upload of the same content was stored first
+            self.delete(name)
+        return blob.name
+
+
+attachment_storage = ContentAddressedStorage()
+
+
+def acquire_blob(name):
+    """Count one more ticket referencing the stored file ``name``."""
+    AttachmentBlob.objects.filter(name=name).update(ref_count=F('ref_count') + 1)
+
+
+def release_blob(name):
+    """Drop one reference to ``name``, deleting the file with the last one."""
+    with transaction.atomic():
+        blob = AttachmentBlob.objects.select_for_update().filter(name=name).first()
+        if blob is None:
+            return
+        if blob.ref_count > 1:
+            AttachmentBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') - 1)
+            return
+        blob.delete()
+        transaction.on_commit(lambda: attachment_storage.delete(name))
+
+
+def discard_unreferenced_blob(name):
+    """
+    Delete the stored file ``name`` unless a ticket references it. Used
+    when a ticket save fails after its attachment was stored, which would
+    otherwise leave the file behind with no references.
+    """
+    with transaction.atomic():
+        blob = AttachmentBlob.objects.select_for_update().filter(name=name).first()
+        if blob is None:
+            # The blob row was rolled back with the ticket; only our own copy remains
+            if not name.startswith(f'{BLOB_DIR}/'):
+                return
+        elif blob.ref_count:
+            return
+        else:
+            blob.delete()
+        transaction.on_commit(lambda: attachment_storage.delete(name))
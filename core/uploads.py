@@ -0,0 +1,51 @@
+"""
+Upload handler that streams files to disk and hashes them on the way.
+
+Every chunk goes straight to a temporary file (nothing is buffered in
+memory) and into a running SHA-256, so ContentAddressedStorage can file
+the upload under its hash without reading it again. Bytes past
+``MAX_UPLOAD_SIZE`` are dropped as they arrive; the file still reports
+its full size, so the size validators reject it with their usual message.
+
+Only the ticket submission view installs this handler (through
+``request.upload_handlers``); every other upload keeps Django's default
+handlers and is never cut short.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+
+
+class HashedUploadedFile(TemporaryUploadedFile):
+    """A temporary upload with its ``sha256`` (None when it was cut off)."""
+    sha256 = None
+
+    @property
+    def truncated(self):
+        return self.sha256 is None
+
+
+class HashingUploadHandler(TemporaryFileUploadHandler):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_size = getattr(settings, 'MAX_UPLOAD_SIZE', 5 * 1024 * 1024)
+
+    def new_file(self, *args, **kwargs):
+        super(TemporaryFileUploadHandler, self).new_file(*args, **kwargs)
+        self.file = HashedUploadedFile(self.file_name, self.content_type, 0, self.charset, self.content_type_extra)
+        self.hasher = hashlib.sha256()
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received <= self.max_size:
+            self.hasher.update(raw_data)
+            self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        if file_size <= self.max_size:
+            file.sha256 = self.hasher.hexdigest()
+        return file
@@ -1,9 +1,12 @@
-from django.shortcuts import render
+from django.shortcuts import render, get_object_or_404
+from django.http import Http404
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.db.models import Avg, Count, Q, F
 from django.utils import timezone
+import os
 from datetime import timedelta
 from Student.models import Ticket, Department, SLAConfig, SLABreachLog, PRIORITY_CHOICES
+from Student.stats import dashboard_days, rollup_metrics
+from .downloads import serve_file
 
 def is_superuser(user):
     return user.is_authenticated and user.is_superuser
@@ -12,87 +15,21 @@ def is_superuser(user):
 @user_passes_test(is_superuser)
 def global_sla_dashboard(request):
     # Get date range (default: last 30 days)
-    days = int(request.GET.get('days', 30))
-    start_date = timezone.now() - timedelta(days=days)
-    
-    # Overall metrics
-    total_tickets = Ticket.objects.filter(created_at__gte=start_date).count()
-    resolved_tickets = Ticket.objects.filter(
-        created_at__gte=start_date,
-        status='resolved'
-    ).count()
-    
-    resolution_rate = (resolved_tickets / total_tickets * 100) if total_tickets > 0 else 0
-    
-    # Average resolution time
-    avg_resolution_time = Ticket.objects.filter(
-        created_at__gte=start_date,
-        resolved_at__isnull=False
-    ).annotate(
-        resolution_time=ExpressionWrapper(
-            F('resolved_at') - F('created_at'),
-            output_field=fields.DurationField()
-        )
-    ).aggregate(
-        avg_time=Avg('resolution_time')
-    )['avg_time']
-    
-    avg_resolution_hours = avg_resolution_time.total_seconds() / 3600 if avg_resolution_time else 0
-    
-    # SLA breaches
-    total_breaches = SLABreachLog.objects.filter(
-        breached_at__gte=start_date
-    ).count()
-    
-    sla_breach_rate = (total_breaches / total_tickets * 100) if total_tickets > 0 else 0
-    
-    # Department-wise metrics
-    departments = Department.objects.all()
-    department_metrics = []
-    
-    for dept in departments:
-        dept_tickets = Ticket.objects.filter(
-            department=dept,
-            created_at__gte=start_date
-        )
-        
-        dept_total = dept_tickets.count()
-        if dept_total > 0:
-            dept_resolved = dept_tickets.filter(status='resolved').count()
-            dept_breaches = SLABreachLog.objects.filter(
-                ticket__department=dept,
-                breached_at__gte=start_date
-            ).count()
-            
-            department_metrics.append({
-                'name': dept.name,
-                'total_tickets': dept_total,
-                'resolution_rate': (dept_resolved / dept_total * 100),
-                'breach_rate': (dept_breaches / dept_total * 100)
-            })
-    
-    # Priority-wise metrics
-    priority_metrics = []
-    for priority, _ in PRIORITY_CHOICES:
-        priority_tickets = Ticket.objects.filter(
-            priority=priority,
-            created_at__gte=start_date
-        )
-        
-        priority_total = priority_tickets.count()
-        if priority_total > 0:
-            priority_resolved = priority_tickets.filter(status='resolved').count()
-            priority_breaches = SLABreachLog.objects.filter(
-                ticket__priority=priority,
-                breached_at__gte=start_date
-            ).count()
-            
-            priority_metrics.append({
-                'priority': priority,
-                'total_tickets': priority_total,
-                'resolution_rate': (priority_resolved / priority_total * 100),
-                'breach_rate': (priority_breaches / priority_total * 100)
-            })
+    days = dashboard_days(request)
+    
+    # Overall metrics, summed from the daily rollup
+    overall = rollup_metrics(days)
+    total_tickets = overall['total_tickets']
+    resolution_rate = overall['resolution_rate']
+    avg_resolution_hours = overall['avg_resolution_hours']
+    sla_breach_rate = overall['breach_rate']
+    
+    # Department-wise and priority-wise metrics
+    department_metrics = [
+        dict(row, name=row['department__name'])
+        for row in rollup_metrics(days, 'department__name', 'department')
+    ]
+    priority_metrics = rollup_metrics(days, 'priority')
     
     context = {
         'total_tickets': total_tickets,
@@ -159,3 +96,29 @@ def global_sla_report(request):
     }
     
     return render(request, 'core/global_sla_report.html', context)
+
+
+def can_view_attachment(request, ticket):
+    """
+    Students see their own tickets; department admins their department's,
+    including tickets escalated away from it.
+    """
+    user = request.user
+    if user.is_superuser or ticket.student_id == user.id:
+        return True
+    profile = request.profile
+    return bool(
+        profile and profile.is_admin
+        and profile.department_id in (ticket.department_id, ticket.original_department_id)
+    )
+
+@login_required
+def ticket_attachment(request, ticket_id):
+    ticket = get_object_or_404(Ticket.objects.only(
+        'id', 'student_id', 'department_id', 'original_department_id', 'attachment', 'attachment_name',
+    ), id=ticket_id)
+    # 404 rather than 403, so ticket IDs cannot be probed
+    if not ticket.attachment or not can_view_attachment(request, ticket):
+        raise Http404("No attachment found")
+    filename = ticket.attachment_name or os.path.basename(ticket.attachment.name)
+    return serve_file(request, ticket.attachment.storage, ticket.attachment.name, filename)
@@ -1,10 +1,26 @@
 from django.contrib import admin
 from Student.models import Ticket
+from Student.search import filter_tickets
 
-class DepartmentComplaintAdmin(admin.ModelAdmin):
+
+class TicketSearchMixin:
+    """
+    Admin search backed by the full-text ticket index. ``search_fields``
+    only holds exact-match lookups; subject, description and comments are
+    matched through Student.search instead of ``icontains`` scans.
+    """
+    search_fields = ('=ticket_id', '=student__username', '=student__email')
+
+    def get_search_results(self, request, queryset, search_term):
+        exact, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if not search_term:
+            return exact, may_have_duplicates
+        return exact | filter_tickets(search_term, queryset), may_have_duplicates
+
+
+class DepartmentComplaintAdmin(TicketSearchMixin, admin.ModelAdmin):
     list_display = ('ticket_id', 'get_student', 'subject', 'status', 'priority', 'created_at')
     list_filter = ('status', 'priority', 'department')
-    search_fields = ('ticket_id', 'subject', 'description', 'student__username', 'student__email')
     readonly_fields = ('ticket_id', 'created_at', 'updated_at')
     date_hierarchy = 'created_at'
     ordering = ('-created_at',)
@@ -20,10 +36,9 @@ class DepartmentComplaintAdmin(admin.ModelAdmin):
         return qs
 
 @admin.register(Ticket)
-class TicketAdmin(admin.ModelAdmin):
+class TicketAdmin(TicketSearchMixin, admin.ModelAdmin):
     list_display = ('ticket_id', 'student', 'department', 'subject', 'status', 'priority', 'created_at')
     list_filter = ('status', 'priority', 'department')
-    search_fields = ('ticket_id', 'subject', 'description', 'student__username', 'student__email')
     readonly_fields = ('ticket_id', 'created_at', 'updated_at')
     date_hierarchy = 'created_at'
     ordering = ('-created_at',)
@@ -13,8 +13,8 @@ class BaseDepartmentAdminSite(AdminSite):
         return (
             request.user.is_active
             and request.user.is_staff
-            and hasattr(request.user, 'profile')
-            and request.user.profile.department.name == self.department_name
+            and request.department is not None
+            and request.department.name == self.department_name
         )
 
     def each_context(self, request):
@@ -0,0 +1,130 @@
+"""
+In-process background runner for bulk student imports.
+
+Uploads are saved as StudentImportJob rows and handed to a small thread
+pool once the request's transaction commits, so the HTTP request returns
+immediately. Jobs left queued (e.g. after a restart) are picked up by the
+``process_import_jobs`` management command, which also re-queues running
+jobs whose worker died; those resume after their last completed chunk.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import StudentImportJob
+from .utils import (
+    DEFAULT_STUDENT_PASSWORD,
+    IMPORT_CHUNK_SIZE,
+    import_student_chunk,
+    read_student_sheet,
+)
+
+logger = logging.getLogger(__name__)
+
+# A running job without a heartbeat for this long is considered abandoned
+LEASE = timedelta(seconds=getattr(settings, 'STUDENT_IMPORT_LEASE_SECONDS', 300))
+# Abandoned jobs are re-queued until they have been started this many times
+MAX_ATTEMPTS = 3
+
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'STUDENT_IMPORT_WORKERS', 1),
+    thread_name_prefix='student-import',
+)
+
+
+def submit_import_job(job):
+    """Run ``job`` in the background after the current transaction commits."""
+    transaction.on_commit(lambda: _executor.submit(_run_in_thread, job.pk))
+
+
+def _run_in_thread(job_id):
+    # Worker threads get their own DB connections; release them when done
+    close_old_connections()
+    try:
+        run_import_job(job_id)
+    finally:
+        close_old_connections()
+
+
+def run_import_job(job_id, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Process a queued import job chunk by chunk, recording progress after
+    every chunk. Returns False if the job was already claimed elsewhere.
+    """
+    jobs = StudentImportJob.objects.filter(pk=job_id)
+    now = timezone.now()
+    # Conditional claim so a job is never processed twice
+    if not jobs.filter(status='queued').update(
+        status='running', started_at=Coalesce('started_at', now), heartbeat_at=now, attempts=F('attempts') + 1,
+    ):
+        return False
+
+    job = jobs.get()
+    try:
+        with job.file.open('rb') as f:
+            rows, errors = read_student_sheet(f)
+        if job.total_rows:
+            # Resumed after a lost worker: skip the chunks already recorded
+            done = job.processed_rows - len(errors)
+        else:
+            done = 0
+            jobs.update(
+                total_rows=len(rows) + len(errors),
+                processed_rows=len(errors),
+                errors=errors,
+            )
+
+        password_hash = make_password(DEFAULT_STUDENT_PASSWORD)
+        for start in range(done, len(rows), chunk_size):
+            chunk = rows.iloc[start:start + chunk_size]
+            # Progress commits with the chunk, so a resumed job never redoes one
+            with transaction.atomic():
+                created = import_student_chunk(chunk, job.department, password_hash)
+                jobs.update(
+                    processed_rows=F('processed_rows') + len(chunk),
+                    created_count=F('created_count') + len(created),
+                    heartbeat_at=timezone.now(),
+                )
+
+        jobs.update(status='completed', finished_at=timezone.now())
+        logger.info(f"Student import job {job_id} completed")
+    except Exception as e:
+        logger.exception(f"Student import job {job_id} failed")
+        job.refresh_from_db()
+        jobs.update(
+            status='failed',
+            finished_at=timezone.now(),
+            errors=job.errors + [f"Import aborted: {e}"],
+        )
+    return True
+
+
+def requeue_stale_jobs(now=None):
+    """
+    Re-queue running jobs whose heartbeat is older than ``LEASE`` (their
+    worker was recycled or killed), or fail them once they have used up
+    ``MAX_ATTEMPTS``. Returns ``(requeued, failed)``.
+    """
+    now = now or timezone.now()
+    stale = StudentImportJob.objects.filter(status='running').filter(
+        Q(heartbeat_at__lt=now - LEASE) | Q(heartbeat_at__isnull=True, started_at__lt=now - LEASE)
+    )
+    failed = 0
+    for job in stale.filter(attempts__gte=MAX_ATTEMPTS):
+        # Conditional, in case the job finished since it was read
+        failed += stale.filter(pk=job.pk).update(
+            status='failed',
+            finished_at=now,
+            errors=job.errors + [f"Import aborted: worker stopped responding {job.attempts} times"],
+        )
+    requeued = stale.filter(attempts__lt=MAX_ATTEMPTS).update(status='queued')
+    if requeued or failed:
+        logger.warning(f"Re-queued {requeued} and failed {failed} abandoned student import jobs")
+    return requeued, failed
@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from dept_admin.jobs import requeue_stale_jobs, run_import_job
+from dept_admin.models import StudentImportJob
+
+
+class Command(BaseCommand):
+    help = ('Run queued bulk student import jobs in this process, re-queueing '
+            'running jobs whose worker stopped responding')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep running and poll for jobs instead of exiting when none are queued')
+        parser.add_argument('--interval', type=float, default=60,
+                            help='Seconds to sleep between polls (with --loop)')
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            requeued, failed = requeue_stale_jobs()
+            if requeued or failed:
+                self.stdout.write(f'Re-queued {requeued} abandoned jobs, failed {failed}')
+
+            job_ids = list(
+                StudentImportJob.objects.filter(status='queued').order_by('created_at').values_list('id', flat=True)
+            )
+            for job_id in job_ids:
+                if run_import_job(job_id):
+                    total += 1
+                    job = StudentImportJob.objects.get(pk=job_id)
+                    self.stdout.write(
+                        f'Job {job_id}: {job.status}, {job.created_count} students created, {len(job.errors)} errors'
+                    )
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+            close_old_connections()
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {total} queued import jobs'))
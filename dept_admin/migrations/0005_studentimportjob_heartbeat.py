@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dept_admin', '0004_studentimportjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentimportjob',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='studentimportjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.contrib.auth.models import User
 from django.utils import timezone
 from core.models import Department
 
@@ -22,4 +23,55 @@ class PendingRegistration(models.Model):
             models.Index(fields=['token']),
             models.Index(fields=['roll_number']),
             models.Index(fields=['is_used', 'expires_at']),
-        ] 
\ No newline at end of file
+        ] 
+
+class StudentImportJob(models.Model):
+    """A bulk student upload processed in the background by dept_admin.jobs."""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    file = models.FileField(upload_to='student_imports/')
+    department = models.ForeignKey(Department, on_delete=models.SET_NULL, null=True, blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='student_import_jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    total_rows = models.PositiveIntegerField(default=0)
+    processed_rows = models.PositiveIntegerField(default=0)
+    created_count = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Touched after every chunk; a running job that stops beating lost its worker
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+    def __str__(self):
+        return f"Student import #{self.pk} ({self.status})"
+
+    @property
+    def rows_per_second(self):
+        if not self.started_at:
+            return 0
+        elapsed = ((self.finished_at or timezone.now()) - self.started_at).total_seconds()
+        return round(self.processed_rows / elapsed, 1) if elapsed > 0 else 0
+
+    def progress(self, max_errors=50):
+        """Snapshot used by the JSON progress endpoint."""
+        return {
+            'id': self.pk,
+            'status': self.status,
+            'total_rows': self.total_rows,
+            'processed_rows': self.processed_rows,
+            'created_count': self.created_count,
+            'error_count': len(self.errors),
+            'errors': self.errors[:max_errors],
+            'percent': round(self.processed_rows * 100 / self.total_rows, 1) if self.total_rows else 0,
+            'rows_per_second': self.rows_per_second,
+        }
+
+    class Meta:
+        ordering = ['-created_at']
@@ -1,10 +1,13 @@
 from django.test import TestCase, Client
+from django.utils import timezone
 from django.urls import reverse
 from unittest.mock import patch
 from django.contrib.auth.models import User
 from core.models import Profile
 from io import BytesIO
 import openpyxl
+import shutil
+import tempfile
 
 # Create your tests here.
 
@@ -66,3 +69,176 @@ class StudentCreationSMSTest(TestCase):
             # Check that SMS was sent for both students
             mock_send_sms_utils.assert_any_call('9123456789', 'https://apollouniversity.edu.in/login')
             mock_send_sms_utils.assert_any_call('9234567890', 'https://apollouniversity.edu.in/login')
+
+
+class BulkStudentImportTest(TestCase):
+    @staticmethod
+    def make_sheet(rows):
+        import io
+        import pandas as pd
+        buffer = io.BytesIO()
+        pd.DataFrame(rows, columns=['Roll Number', 'First Name', 'Last Name', 'Phone Number']).to_excel(buffer, index=False)
+        buffer.seek(0)
+        return buffer
+
+    def test_import_creates_and_updates_students_in_bulk(self):
+        from core.models import Department, OutboundEmail
+        from dept_admin.utils import process_excel_file, DEFAULT_STUDENT_PASSWORD
+        department, _ = Department.objects.get_or_create(name='Academics')
+        existing = User.objects.create_user('240202400002', 'old@example.com', 'oldpass', first_name='Old')
+
+        rows = [
+            [f'2402024{n:05d}', 'Bulk', f'Student{n}', f'91234{n:05d}'] for n in range(1, 201)
+        ] + [
+            ['12345', 'Bad', 'Roll', '9123456789'],
+            ['240202409999', '', 'Nameless', '9123456789'],
+            ['240202409998', 'Bad', 'Phone', '12'],
+        ]
+        with self.assertNumQueries(13):
+            created, errors = process_excel_file(self.make_sheet(rows), department)
+
+        self.assertEqual(len(created), 200)
+        self.assertEqual(errors, [
+            'Row 202: Invalid roll number format. Must be exactly 12 digits.',
+            'Row 203: First name and last name are required.',
+            'Row 204: Invalid phone number. Must be a 10-digit number.',
+        ])
+        self.assertEqual(Profile.objects.filter(department=department, must_change_password=True).count(), 200)
+        self.assertEqual(OutboundEmail.objects.count(), 200)
+
+        existing.refresh_from_db()
+        self.assertEqual(existing.first_name, 'Bulk')
+        self.assertEqual(existing.email, '240202400002@apollouniversity.edu.in')
+        self.assertTrue(existing.check_password(DEFAULT_STUDENT_PASSWORD))
+        self.assertEqual(existing.profile.phone_number, '9123400002')
+
+
+class StudentImportJobTest(TestCase):
+    def setUp(self):
+        # Keep uploaded sheets out of the real media directory
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_override = self.settings(MEDIA_ROOT=media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+        User.objects.create_superuser('admin', 'admin@example.com', 'adminpass')
+        self.client.login(username='admin', password='adminpass')
+
+    def test_upload_is_queued_and_progress_is_polled(self):
+        from dept_admin.jobs import run_import_job
+        from dept_admin.models import StudentImportJob
+        rows = [[f'2402024{n:05d}', 'Job', f'Student{n}', f'91234{n:05d}'] for n in range(1, 6)] + [['12345', 'Bad', 'Roll', '9123456789']]
+        sheet = BulkStudentImportTest.make_sheet(rows)
+        sheet.name = 'students.xlsx'
+
+        with patch('dept_admin.jobs._executor') as mock_executor, \
+             self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('dept_admin:bulk_create_students'), {'file': sheet})
+
+        job = StudentImportJob.objects.get()
+        self.assertRedirects(response, f"{reverse('dept_admin:bulk_create_students')}?job={job.id}")
+        mock_executor.submit.assert_called_once()
+        self.assertFalse(User.objects.filter(username='240202400001').exists())
+
+        progress_url = reverse('dept_admin:student_import_progress', args=[job.id])
+        self.assertEqual(self.client.get(progress_url).json()['status'], 'queued')
+
+        self.assertTrue(run_import_job(job.id, chunk_size=2))
+        # A job is only ever processed once
+        self.assertFalse(run_import_job(job.id))
+
+        progress = self.client.get(progress_url).json()
+        self.assertEqual(progress['status'], 'completed')
+        self.assertEqual((progress['total_rows'], progress['processed_rows']), (6, 6))
+        self.assertEqual(progress['created_count'], 5)
+        self.assertEqual(progress['percent'], 100)
+        self.assertEqual(progress['errors'], ['Row 7: Invalid roll number format. Must be exactly 12 digits.'])
+        self.assertEqual(User.objects.filter(username__startswith='2402024').count(), 5)
+
+    def test_unreadable_file_marks_job_failed(self):
+        from django.core.files.base import ContentFile
+        from dept_admin.jobs import run_import_job
+        from dept_admin.models import StudentImportJob
+        job = StudentImportJob.objects.create(file=ContentFile(b'not a spreadsheet', name='broken.xlsx'))
+
+        run_import_job(job.id)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertTrue(job.errors[-1].startswith('Import aborted:'))
+
+
+    def test_abandoned_job_is_requeued_and_resumed(self):
+        from datetime import timedelta
+        from django.core.files.base import ContentFile
+        from dept_admin.jobs import LEASE, MAX_ATTEMPTS, requeue_stale_jobs, run_import_job
+        from dept_admin.models import StudentImportJob
+        rows = [[f'2402024{n:05d}', 'Job', f'Student{n}', f'91234{n:05d}'] for n in range(1, 7)]
+        sheet = ContentFile(BulkStudentImportTest.make_sheet(rows).getvalue(), name='students.xlsx')
+        # The worker died after committing the first two rows
+        stale = timezone.now() - LEASE - timedelta(seconds=1)
+        job = StudentImportJob.objects.create(
+            file=sheet, status='running', attempts=1, started_at=stale, heartbeat_at=stale,
+            total_rows=6, processed_rows=2, created_count=2,
+        )
+        fresh = StudentImportJob.objects.create(file=sheet, status='running', attempts=1, heartbeat_at=timezone.now())
+        dead = StudentImportJob.objects.create(file=sheet, status='running', attempts=MAX_ATTEMPTS, heartbeat_at=stale)
+
+        self.assertEqual(requeue_stale_jobs(), (1, 1))
+        for pending, status in ((job, 'queued'), (fresh, 'running'), (dead, 'failed')):
+            pending.refresh_from_db()
+            self.assertEqual(pending.status, status)
+
+        self.assertTrue(run_import_job(job.id, chunk_size=2))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.processed_rows, job.created_count), ('completed', 2, 6, 6))
+        self.assertEqual(job.started_at, stale)
+        # Only the rows after the last recorded chunk were imported again
+        self.assertEqual(
+            sorted(User.objects.filter(username__startswith='2402024').values_list('username', flat=True)),
+            [f'2402024{n:05d}' for n in range(3, 7)],
+        )
+
+
+class ExportComplaintsTest(TestCase):
+    def setUp(self):
+        from core.models import Department
+        from Student.models import Ticket
+        self.finance, _ = Department.objects.get_or_create(name='Finance')
+        admin = User.objects.create_user('finance_admin', 'finance@apollouniversity.edu', 'adminpass')
+        admin.profile.is_admin = True
+        admin.profile.must_change_password = False
+        admin.profile.department = self.finance
+        admin.profile.save()
+        self.client.force_login(admin)
+
+        for n, (status, priority) in enumerate([('open', 'high'), ('resolved', 'low'), ('open', 'low')]):
+            student = User.objects.create_user(f'24020240010{n}', f'24020240010{n}@apollouniversity.edu.in', 'pass')
+            Ticket.objects.create(
+                student=student, department=self.finance, subject=f'Ticket {n}',
+                description='My fee receipt was not generated.', status=status, priority=priority,
+            )
+
+    def read_csv(self, response):
+        import csv
+        return list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+
+    def test_export_streams_rows_without_per_row_queries(self):
+        response = self.client.get(reverse('dept_admin:export_complaints'))
+        self.assertTrue(response.streaming)
+        # Rows are fetched while streaming: one query regardless of row count
+        with self.assertNumQueries(1):
+            rows = self.read_csv(response)
+        self.assertEqual(rows[0][:5], ['Ticket ID', 'Student', 'Subject', 'Status', 'Created At'])
+        self.assertEqual(len(rows), 4)
+        self.assertEqual({row[6] for row in rows[1:]}, {'Finance'})
+
+    def test_export_filters(self):
+        today = timezone.localdate().isoformat()
+        response = self.client.get(reverse('dept_admin:export_complaints'), {'status': 'open', 'priority': 'low', 'from': today, 'to': today})
+        rows = self.read_csv(response)
+        self.assertEqual([row[2] for row in rows[1:]], ['Ticket 2'])
+
+        response = self.client.get(reverse('dept_admin:export_complaints'), {'to': '2020-01-01'})
+        self.assertEqual(len(self.read_csv(response)), 1)
@@ -26,8 +26,10 @@ urlpatterns = [
     path('create-student/', views.create_student, name='create_student'),
     path('escalate-ticket/<int:ticket_id>/', views.escalate_ticket, name='escalate_ticket'),
     path('view-tickets/<str:priority>/', views.view_tickets, name='view_tickets'),
+    path('search/', views.search_tickets, name='search_tickets'),
     path('escalate-priority/<str:priority>/', views.escalate_priority, name='escalate_priority'),
     path('bulk-create-students/', views.bulk_create_students, name='bulk_create_students'),
+    path('bulk-create-students/<int:job_id>/progress/', views.student_import_progress, name='student_import_progress'),
     path('download-template/', views.download_template, name='download_template'),
     path('escalated-tickets/', views.general_escalated_tickets, name='escalated_tickets'),
     path('handle-escalated-ticket/<int:ticket_id>/', views.handle_escalated_ticket, name='handle_escalated_ticket'),
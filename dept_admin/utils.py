@@ -1,5 +1,6 @@
 import pandas as pd
 import io
+import csv
 from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from django.db import transaction
@@ -13,11 +14,45 @@ from django.utils.crypto import get_random_string
 from django.conf import settings
 from django.urls import reverse
 from core.models import Profile
-from core.utils import send_student_email_via_brevo_api
+from core.emails import render_batch
+from core.outbox import queue_emails
+from django.contrib.auth.hashers import make_password
 from django.contrib import messages
 
 logger = logging.getLogger(__name__)
 
+# Rows fetched per database round-trip when streaming a ticket export
+EXPORT_CHUNK_SIZE = 2000
+
+TICKET_EXPORT_HEADERS = [
+    'Ticket ID', 'Student', 'Subject', 'Status', 'Created At',
+    'Priority', 'Department', 'Resolved At', 'SLA Breach',
+]
+
+
+class Echo:
+    """File-like object that hands back what is written, so csv.writer rows can be streamed."""
+    def write(self, value):
+        return value
+
+
+def stream_tickets_csv(tickets, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield ``tickets`` as CSV lines without loading the queryset into memory."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(TICKET_EXPORT_HEADERS)
+    for ticket in tickets.select_related('student', 'department').iterator(chunk_size=chunk_size):
+        yield writer.writerow([
+            ticket.ticket_id,
+            ticket.student.username if ticket.student else 'Anonymous',
+            ticket.subject,
+            ticket.status,
+            ticket.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+            ticket.priority,
+            ticket.department.name,
+            ticket.resolved_at.strftime('%Y-%m-%d %H:%M:%S') if ticket.resolved_at else '',
+            'Yes' if ticket.sla_breach else 'No',
+        ])
+
 def create_excel_template():
     """Create an Excel template for bulk student creation."""
     wb = Workbook()
@@ -82,154 +117,142 @@ def check_user_profile_status(roll_number):
     except User.DoesNotExist:
         print(f"User not found: {roll_number}")
 
+# Password every bulk-imported student gets until their forced first-login change
+DEFAULT_STUDENT_PASSWORD = 'Random@123'
+
+STUDENT_COLUMNS = ['Roll Number', 'First Name', 'Last Name', 'Phone Number']
+
+# Rows written per transaction / bulk query
+IMPORT_CHUNK_SIZE = 500
+
+
+def read_student_sheet(file):
+    """
+    Read and validate an uploaded student sheet.
+
+    Validation is done column-wise with pandas masks. Returns a DataFrame of
+    valid rows (indexed by spreadsheet row number, duplicates resolved in
+    favour of the last occurrence) and a list of row error messages.
+    """
+    df = pd.read_excel(file, dtype=str)  # Read all columns as strings
+    logger.info(f"Read Excel file. Shape: {df.shape}")
+
+    # Clean column names and data
+    df.columns = df.columns.str.strip()
+    missing_columns = [col for col in STUDENT_COLUMNS if col not in df.columns]
+    if missing_columns:
+        raise ValueError(f"Missing required columns: {', '.join(missing_columns)}")
+
+    df = df[STUDENT_COLUMNS].fillna('').apply(lambda col: col.str.strip())
+    df.index = df.index + 2  # Spreadsheet row numbers (1-based, after header)
+
+    bad_roll = ~df['Roll Number'].str.fullmatch(r'\d{12}')
+    bad_name = ~bad_roll & ((df['First Name'] == '') | (df['Last Name'] == ''))
+    bad_phone = ~bad_roll & ~bad_name & ~df['Phone Number'].str.fullmatch(r'\d{10}')
+
+    row_errors = pd.concat([
+        pd.Series("Invalid roll number format. Must be exactly 12 digits.", index=df.index[bad_roll]),
+        pd.Series("First name and last name are required.", index=df.index[bad_name]),
+        pd.Series("Invalid phone number. Must be a 10-digit number.", index=df.index[bad_phone]),
+    ]).sort_index()
+    errors = [f"Row {row}: {message}" for row, message in row_errors.items()]
+
+    valid = df[~(bad_roll | bad_name | bad_phone)]
+    valid = valid.drop_duplicates(subset='Roll Number', keep='last')
+    return valid, errors
+
+
+def import_student_chunk(rows, department, password_hash):
+    """
+    Create or update the students in ``rows`` (a slice of the DataFrame from
+    ``read_student_sheet``) with a constant number of queries, and queue
+    their welcome emails. Returns the imported students as dicts.
+    """
+    students = [
+        {
+            'roll_number': roll_number,
+            'first_name': first_name,
+            'last_name': last_name,
+            'phone_number': phone_number,
+            'email': f"{roll_number}@apollouniversity.edu.in",
+        }
+        for roll_number, first_name, last_name, phone_number in rows[STUDENT_COLUMNS].itertuples(index=False)
+    ]
+    usernames = [s['roll_number'] for s in students]
+
+    with transaction.atomic():
+        existing = User.objects.in_bulk(usernames, field_name='username')
+
+        new_users = []
+        for student in students:
+            user = existing.get(student['roll_number']) or User(username=student['roll_number'])
+            user.email = student['email']
+            user.first_name = student['first_name']
+            user.last_name = student['last_name']
+            user.is_active = True
+            # The default password is shared, so it is hashed once per import
+            user.password = password_hash
+            if user.pk is None:
+                new_users.append(user)
+
+        User.objects.bulk_update(
+            list(existing.values()),
+            ['email', 'first_name', 'last_name', 'is_active', 'password'],
+        )
+        # bulk_create skips post_save, so profiles are created below
+        User.objects.bulk_create(new_users)
+        user_ids = dict(User.objects.filter(username__in=usernames).values_list('username', 'id'))
+
+        profiles = Profile.objects.in_bulk(list(user_ids.values()), field_name='user_id')
+        new_profiles = []
+        for student in students:
+            user_id = user_ids[student['roll_number']]
+            profile = profiles.get(user_id) or Profile(user_id=user_id)
+            profile.department = department
+            profile.is_admin = False
+            profile.must_change_password = True
+            profile.phone_number = student['phone_number']
+            if profile.pk is None:
+                new_profiles.append(profile)
+
+        Profile.objects.bulk_update(
+            list(profiles.values()),
+            ['department', 'is_admin', 'must_change_password', 'phone_number'],
+        )
+        Profile.objects.bulk_create(new_profiles)
+
+        bodies = render_batch('dept_admin/emails/welcome.html', [
+            {'first_name': s['first_name'], 'roll_number': s['roll_number'], 'password': DEFAULT_STUDENT_PASSWORD}
+            for s in students
+        ])
+        queue_emails(
+            ("Your Apollo University Account Has Been Created", html, s['email'])
+            for s, html in zip(students, bodies)
+        )
+
+    for student in students:
+        del student['phone_number']
+    return students
+
+
 def process_excel_file(file, department, request=None):
     """Process the uploaded Excel file and create student accounts."""
     try:
         logger.info("Starting to process Excel file")
-        
-        # Read the Excel file
-        df = pd.read_excel(file, dtype=str)  # Read all columns as strings
-        logger.info(f"Read Excel file. Shape: {df.shape}")
-        
-        # Clean column names and data
-        df.columns = df.columns.str.strip()
-        for col in df.columns:
-            if df[col].dtype == 'object':
-                df[col] = df[col].str.strip()
-        
-        # Verify required columns
-        required_columns = ['Roll Number', 'First Name', 'Last Name', 'Phone Number']
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        if missing_columns:
-            error_msg = f"Missing required columns: {', '.join(missing_columns)}"
-            logger.error(error_msg)
-            raise ValueError(error_msg)
-        
-        created_students = []
-        errors = []
-        
-        # Process each row
-        for index, row in df.iterrows():
-            try:
-                # Get and validate roll number
-                roll_number = str(row['Roll Number'])
-                if not roll_number or not roll_number.isdigit() or len(roll_number) != 12:
-                    errors.append(f"Row {index + 2}: Invalid roll number format. Must be exactly 12 digits.")
-                    continue
-
-                # Get and validate names
-                first_name = str(row['First Name'])
-                last_name = str(row['Last Name'])
-                if not first_name or not last_name:
-                    errors.append(f"Row {index + 2}: First name and last name are required.")
-                    continue
+        rows, errors = read_student_sheet(file)
 
-                # Get and validate phone number
-                phone_number = str(row['Phone Number']).strip()
-                if not phone_number or not phone_number.isdigit() or len(phone_number) != 10:
-                    errors.append(f"Row {index + 2}: Invalid phone number. Must be a 10-digit number.")
-                    continue
-
-                # Generate email
-                email = f"{roll_number}@apollouniversity.edu.in"
-                
-                # Create or update user and profile
-                with transaction.atomic():
-                    # Check if user exists
-                    user, created = User.objects.get_or_create(
-                        username=roll_number,
-                        defaults={
-                            'email': email,
-                            'first_name': first_name,
-                            'last_name': last_name,
-                            'is_active': True
-                        }
-                    )
+        password_hash = make_password(DEFAULT_STUDENT_PASSWORD)
+        created_students = []
+        for start in range(0, len(rows), IMPORT_CHUNK_SIZE):
+            created_students.extend(
+                import_student_chunk(rows.iloc[start:start + IMPORT_CHUNK_SIZE], department, password_hash)
+            )
+        logger.info(f"Imported {len(created_students)} students, {len(errors)} rows rejected")
 
-                    if not created:
-                        # Update existing user
-                        user.email = email
-                        user.first_name = first_name
-                        user.last_name = last_name
-                        user.is_active = True
-                    # Set/reset password
-                    user.set_password('Random@123')
-                    user.save()
-                    # Create or update profile
-                    profile, _ = Profile.objects.get_or_create(
-                        user=user,
-                        defaults={
-                            'department': department,
-                            'is_admin': False,
-                            'must_change_password': True,
-                            'phone_number': phone_number
-                        }
-                    )
-                    # Update profile if it existed
-                    profile.department = department
-                    profile.is_admin = False
-                    profile.must_change_password = True
-                    profile.phone_number = phone_number
-                    profile.save()
-                    # Send registration email using Brevo API
-                    html_message = f"""
-                    <!DOCTYPE html>
-                    <html>
-                    <head>
-                        <meta charset='utf-8'>
-                        <style>
-                            body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                            .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                            .header {{ background-color: #1E40AF; color: white; padding: 20px; text-align: center; border-radius: 5px 5px 0 0; }}
-                            .content {{ padding: 20px; background-color: #f9f9f9; border: 1px solid #ddd; border-radius: 0 0 5px 5px; }}
-                            .footer {{ text-align: center; margin-top: 20px; font-size: 12px; color: #666; }}
-                        </style>
-                    </head>
-                    <body>
-                        <div class='container'>
-                            <div class='header'>
-                                <h1>Welcome to Apollo University</h1>
-                            </div>
-                            <div class='content'>
-                                <p>Hello {first_name},</p>
-                                <p>Your student account has been created successfully!</p>
-                                <p><strong>Username:</strong> {roll_number}<br>
-                                <strong>Password:</strong> Random@123</p>
-                                <p><strong>Note:</strong> Password change is mandatory on first login.</p>
-                                <p>Regards,<br>Apollo University Support Team</p>
-                            </div>
-                            <div class='footer'>
-                                <p>This is an automated message, please do not reply to this email.</p>
-                                <p>&copy; {timezone.now().year} Apollo University. All rights reserved.</p>
-                            </div>
-                        </div>
-                    </body>
-                    </html>
-                    """
-                    mail_sent = send_student_email_via_brevo_api(
-                        subject="Your Apollo University Account Has Been Created",
-                        message=html_message,
-                        recipient_email=email
-                    )
-                    if request is not None:
-                        if mail_sent:
-                            messages.success(request, f"Account creation email sent to {email}.")
-                        else:
-                            messages.error(request, f"Failed to send account creation email to {email}.")
-                    created_students.append({
-                        'roll_number': roll_number,
-                        'first_name': first_name,
-                        'last_name': last_name,
-                        'email': email
-                    })
-                    logger.info(f"Successfully processed student: {roll_number}")
-            except Exception as e:
-                error_msg = f"Row {index + 2}: Error processing student: {str(e)}"
-                logger.error(error_msg)
-                errors.append(error_msg)
-                continue
+        if request is not None and created_students:
+            messages.success(request, f"Account creation emails queued for {len(created_students)} students.")
         return created_students, errors
-        
+
     except Exception as e:
         error_msg = f"Error processing Excel file: {str(e)}"
         logger.error(error_msg)
@@ -9,7 +9,8 @@ import string
 import random
 from datetime import datetime, timedelta
 from django.utils import timezone
-from django.http import HttpResponse
+from django.utils.dateparse import parse_date
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 import csv
 from .forms import UpdateComplaintForm, CreateStudentForm
 from django.views.decorators.csrf import csrf_protect, ensure_csrf_cookie
@@ -17,7 +18,13 @@ from django.middleware.csrf import rotate_token, get_token
 from django.db.models import Avg, Count, Q, F, ExpressionWrapper, fields
 import json
 from Student.models import Ticket, SLAConfig, SLABreachLog, PRIORITY_CHOICES, TicketUpdate, STATUS_CHOICES
-from .utils import create_excel_template, process_excel_file, process_student_registrations
+from Student.search import search_tickets as run_ticket_search
+from Student.sla import due_soon
+from Student.stats import TicketStats, dashboard_days, rollup_metrics
+from core.pagination import MAX_PAGE_SIZE, KeysetPage, paginate, wants_json, page_json_response
+from .utils import create_excel_template, process_excel_file, process_student_registrations, stream_tickets_csv
+from .models import StudentImportJob
+from .jobs import submit_import_job
 from Student.decorators import dept_admin_required
 from .decorators import is_dept_admin
 from django import forms
@@ -124,7 +131,7 @@ def dept_admin_logout(request):
 @dept_admin_required
 def dashboard(request):
     # Get the department from the user's profile
-    department = request.user.profile.department
+    department = request.department
     department_name = department.name if department else None
 
     if not department:
@@ -139,44 +146,37 @@ def dashboard(request):
             status__in=['escalated', 'in_progress', 'resolved']
         ).select_related(
             'student',
+            'department',
             'original_department',
             'escalated_by'
-        ).order_by('-escalated_at', '-created_at')
+        )
     else:
         # For other departments, show their own tickets
         tickets = Ticket.objects.filter(
             department=department
         ).select_related(
-            'student'
-        ).order_by('-created_at')
-    
-    # Calculate statistics
-    total_tickets = tickets.count()
-    escalated_count = tickets.filter(status='escalated').count()
-    in_progress_count = tickets.filter(status='in_progress').count()
-    resolved_count = tickets.filter(status='resolved').count()
-    
-    # Calculate SLA metrics
-    total_resolved = tickets.filter(status='resolved')
-    total_active = tickets.filter(status__in=['escalated', 'in_progress'])
+            'student',
+            'department'
+        )
     
-    # Calculate resolution rate
-    resolution_rate = (resolved_count / total_tickets * 100) if total_tickets > 0 else 0
+    # Calculate statistics and SLA metrics in one query
+    stats = TicketStats(tickets, buckets=['total', 'escalated', 'in_progress', 'resolved', 'sla_compliant'])
     
-    # Calculate SLA compliance
-    sla_compliant = tickets.filter(sla_breach=False).count()
-    sla_compliance = (sla_compliant / total_tickets * 100) if total_tickets > 0 else 0
+    # Only one page of tickets is loaded, newest (or most recently escalated) first
+    page = paginate(request, tickets, 'escalated_at' if department.name == 'General' else 'created_at')
+    if wants_json(request):
+        return page_json_response(page)
     
     context = {
-        'tickets': tickets,
+        'tickets': page,
         'department': department,
         'department_name': department_name,
-        'total_tickets': total_tickets,
-        'escalated_count': escalated_count,
-        'in_progress_count': in_progress_count,
-        'resolved_count': resolved_count,
-        'resolution_rate': resolution_rate,
-        'sla_compliance': sla_compliance,
+        'total_tickets': stats['total'],
+        'escalated_count': stats['escalated'],
+        'in_progress_count': stats['in_progress'],
+        'resolved_count': stats['resolved'],
+        'resolution_rate': stats.rate('resolved'),
+        'sla_compliance': stats.rate('sla_compliant'),
         'is_general_dept': department.name == 'General'
     }
     
@@ -185,7 +185,7 @@ def dashboard(request):
 @login_required
 @dept_admin_required
 def view_ticket(request, ticket_id):
-    department = request.user.profile.department
+    department = request.department
     ticket = Ticket.objects.get(id=ticket_id, department=department)
     
     if request.method == 'POST':
@@ -210,7 +210,7 @@ def view_ticket(request, ticket_id):
 @login_required
 @dept_admin_required
 def manage_sla(request):
-    department = request.user.profile.department
+    department = request.department
     
     if request.method == 'POST':
         priority = request.POST.get('priority')
@@ -245,7 +245,7 @@ def manage_sla(request):
 def update_complaint(request, complaint_id):
     # Get the ticket
     ticket = get_object_or_404(Ticket, id=complaint_id)
-    department = request.user.profile.department
+    department = request.department
 
     # Check if user has permission to update this ticket
     if ticket.department != department:
@@ -293,80 +293,59 @@ def update_complaint(request, complaint_id):
 
 @login_required
 def export_complaints(request):
-    if not request.user.profile.is_admin:
+    if not (request.profile and request.profile.is_admin):
         messages.error(request, 'Access denied. Department admin privileges required.')
         return redirect('dept_admin:login')
 
-    tickets = Ticket.objects.filter(department=request.user.profile.department)
-    
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="{request.user.profile.department}_tickets.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['Ticket ID', 'Student', 'Subject', 'Status', 'Created At'])
-    
-    for ticket in tickets:
-        writer.writerow([
-            ticket.ticket_id,
-            ticket.student.username if ticket.student else 'Anonymous',
-            ticket.subject,
-            ticket.status,
-            ticket.created_at.strftime('%Y-%m-%d %H:%M:%S')
-        ])
+    tickets = Ticket.objects.filter(department=request.department)
     
+    # Optional filters: ?status=&priority=&from=YYYY-MM-DD&to=YYYY-MM-DD
+    status = request.GET.get('status')
+    if status in dict(STATUS_CHOICES):
+        tickets = tickets.filter(status=status)
+    priority = request.GET.get('priority')
+    if priority in dict(PRIORITY_CHOICES):
+        tickets = tickets.filter(priority=priority)
+    try:
+        date_from = parse_date(request.GET.get('from', ''))
+        date_to = parse_date(request.GET.get('to', ''))
+    except ValueError:
+        messages.error(request, 'Invalid date range. Use YYYY-MM-DD.')
+        return redirect('dept_admin:dashboard')
+    # Compare against local-midnight bounds so the created_at index can be used
+    if date_from:
+        tickets = tickets.filter(created_at__gte=timezone.make_aware(datetime.combine(date_from, datetime.min.time())))
+    if date_to:
+        tickets = tickets.filter(created_at__lt=timezone.make_aware(datetime.combine(date_to + timedelta(days=1), datetime.min.time())))
+    
+    # Stream rows as they are read so large exports start downloading immediately
+    response = StreamingHttpResponse(stream_tickets_csv(tickets), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{request.department}_tickets.csv"'
     return response
 
 @login_required
 @user_passes_test(is_dept_admin)
 def dept_sla_dashboard(request):
-    department = request.user.profile.department
+    department = request.department
     
     # Prevent General department from accessing SLA dashboard
     if department.name == 'General':
         messages.error(request, 'The General department does not have access to the SLA dashboard.')
         return redirect('dept_admin:dashboard')
     
-    days = int(request.GET.get('days', 30))
-    start_date = timezone.now() - timedelta(days=days)
-    
-    # Get total tickets
-    total_tickets = Ticket.objects.filter(
-        department=department,
-        created_at__gte=start_date
-    ).count()
+    days = dashboard_days(request)
     
-    # Get resolved tickets
-    resolved_tickets = Ticket.objects.filter(
-        department=department,
-        created_at__gte=start_date,
-        status='resolved'
-    ).count()
-    
-    resolution_rate = (resolved_tickets / total_tickets * 100) if total_tickets > 0 else 0
-    
-    # Average resolution time
-    avg_resolution_time = Ticket.objects.filter(
-        department=department,
-        created_at__gte=start_date,
-        resolved_at__isnull=False
-    ).annotate(
-        resolution_time=ExpressionWrapper(
-            F('resolved_at') - F('created_at'),
-            output_field=fields.DurationField()
-        )
-    ).aggregate(
-        avg_time=Avg('resolution_time')
-    )['avg_time']
-    
-    avg_resolution_hours = avg_resolution_time.total_seconds() / 3600 if avg_resolution_time else 0
-    
-    # SLA breaches
-    total_breaches = SLABreachLog.objects.filter(
-        ticket__department=department,
-        breached_at__gte=start_date
-    ).count()
-    
-    sla_breach_rate = (total_breaches / total_tickets * 100) if total_tickets > 0 else 0
+    # Totals, resolution time and breaches, summed from the daily rollup
+    metrics = rollup_metrics(days, department=department)
+    total_tickets = metrics['total_tickets']
+    resolution_rate = metrics['resolution_rate']
+    avg_resolution_hours = metrics['avg_resolution_hours']
+    sla_breach_rate = metrics['breach_rate']
+
+    # Open tickets closest to (or past) their resolution deadline
+    due_soon_tickets = due_soon(
+        Ticket.objects.filter(department=department)
+    ).select_related('student')[:10]
     
     context = {
         'department': department,
@@ -374,6 +353,7 @@ def dept_sla_dashboard(request):
         'resolution_rate': round(resolution_rate, 1),
         'avg_resolution_hours': round(avg_resolution_hours, 1),
         'sla_breach_rate': round(sla_breach_rate, 1),
+        'due_soon_tickets': due_soon_tickets,
         'days': days
     }
     
@@ -382,7 +362,7 @@ def dept_sla_dashboard(request):
 @login_required
 @user_passes_test(is_dept_admin)
 def manage_sla_config(request):
-    department = request.user.profile.department
+    department = request.department
     
     if request.method == 'POST':
         priority = request.POST.get('priority')
@@ -415,7 +395,7 @@ def manage_sla_config(request):
 @login_required
 @user_passes_test(is_dept_admin)
 def sla_breach_report(request):
-    department = request.user.profile.department
+    department = request.department
     days = int(request.GET.get('days', 30))
     start_date = timezone.now() - timedelta(days=days)
     
@@ -627,7 +607,7 @@ def create_student(request):
 @user_passes_test(is_dept_admin)
 def escalate_ticket(request, ticket_id):
     print(f"[DEBUG] escalate_ticket view called for ticket_id: {ticket_id}")
-    ticket = get_object_or_404(Ticket, id=ticket_id, department=request.user.profile.department)
+    ticket = get_object_or_404(Ticket, id=ticket_id, department=request.department)
     print(f"[DEBUG] Found ticket: {ticket.ticket_id}, status: {ticket.status}, student: {ticket.student.email}")
     
     if request.method == 'POST':
@@ -640,9 +620,11 @@ def escalate_ticket(request, ticket_id):
         
         try:
             print(f"[DEBUG] escalate_ticket view: calling ticket.escalate for ticket {ticket.ticket_id}")
-            ticket.escalate(request.user, reason)
-            print(f"[DEBUG] escalate_ticket view: escalation complete for ticket {ticket.ticket_id}")
-            messages.success(request, "Ticket escalated and student notified via email.")
+            if ticket.escalate(request.user, reason):
+                print(f"[DEBUG] escalate_ticket view: escalation complete for ticket {ticket.ticket_id}")
+                messages.success(request, "Ticket escalated and student notified via email.")
+            else:
+                messages.info(request, "This ticket has already been escalated.")
         except Exception as e:
             print(f"[ERROR] escalate_ticket view: escalation failed for ticket {ticket.ticket_id}: {e}")
             messages.error(request, f"Escalation failed: {e}")
@@ -653,23 +635,46 @@ def escalate_ticket(request, ticket_id):
 @login_required
 @user_passes_test(is_dept_admin)
 def view_tickets(request, priority):
-    department = request.user.profile.department
+    department = request.department
     tickets = Ticket.objects.filter(
         department=department,
         priority=priority,
         status__in=['open', 'in_progress', 'on_hold']
-    ).order_by('-created_at')
+    ).select_related('student', 'department')
+    
+    page = paginate(request, tickets)
+    if wants_json(request):
+        return page_json_response(page)
     
     context = {
-        'tickets': tickets,
+        'tickets': page,
         'priority': priority,
     }
     return render(request, 'dept_admin/ticket_list.html', context)
 
+@login_required
+@dept_admin_required
+def search_tickets(request):
+    query = request.GET.get('q', '').strip()
+    tickets = []
+    if query:
+        tickets = run_ticket_search(
+            query, Ticket.objects.filter(department=request.department), limit=MAX_PAGE_SIZE,
+        )
+
+    if wants_json(request):
+        return page_json_response(KeysetPage(tickets))
+
+    context = {
+        'tickets': tickets,
+        'query': query,
+    }
+    return render(request, 'dept_admin/ticket_search.html', context)
+
 @login_required
 @user_passes_test(is_dept_admin)
 def escalate_priority(request, priority):
-    department = request.user.profile.department
+    department = request.department
     
     if request.method == 'POST':
         reason = request.POST.get('reason')
@@ -683,13 +688,11 @@ def escalate_priority(request, priority):
             status__in=['open', 'in_progress', 'on_hold']
         )
         
-        escalated_count = 0
-        for ticket in tickets:
-            try:
-                ticket.escalate(request.user, reason)
-                escalated_count += 1
-            except Exception as e:
-                messages.error(request, f'Failed to escalate ticket {ticket.ticket_id}: {str(e)}')
+        try:
+            escalated_count = len(Ticket.objects.bulk_escalate(tickets, request.user, reason))
+        except Exception as e:
+            escalated_count = 0
+            messages.error(request, f'Failed to escalate {priority} priority tickets: {str(e)}')
         
         if escalated_count > 0:
             messages.success(request, f'Successfully escalated {escalated_count} {priority} priority tickets.')
@@ -717,47 +720,37 @@ def bulk_create_students(request):
             messages.error(request, 'Please upload a file.')
             return render(request, 'dept_admin/bulk_create_students.html')
         
-        try:
-            file = request.FILES['file']
-            
-            # Check file type
-            if not file.name.endswith(('.xlsx', '.xls')):
-                messages.error(request, 'Please upload a valid Excel file (.xlsx or .xls)')
-                return render(request, 'dept_admin/bulk_create_students.html')
-            
-            logger.info(f"Processing uploaded file: {file.name}")
-            created_students, errors = process_excel_file(file, None)  # None for department since superuser
-            
-            if errors:
-                for error in errors:
-                    messages.warning(request, error)
-            
-            if created_students:
-                success_message = (
-                    f"Successfully created {len(created_students)} student accounts.\n\n"
-                    "Default password for all accounts: Random@123\n"
-                    "Students will be required to change their password on first login.\n\n"
-                    "Created accounts:\n" +
-                    '\n'.join([f"Roll Number: {s['roll_number']}, Name: {s['first_name']} {s['last_name']}, Email: {s['email']}"
-                              for s in created_students])
-                )
-                messages.success(request, success_message)
-                logger.info(f"Successfully created {len(created_students)} students")
-            else:
-                messages.warning(request, "No students were created. Please check the file format and try again.")
-                logger.warning("No students were created from the uploaded file")
-    
-            return render(request, 'dept_admin/bulk_create_students.html', {
-                'preview_data': created_students
-            })
-            
-        except Exception as e:
-            error_message = f'Error processing file: {str(e)}'
-            messages.error(request, error_message)
-            logger.error(error_message)
+        file = request.FILES['file']
+        
+        # Check file type
+        if not file.name.endswith(('.xlsx', '.xls')):
+            messages.error(request, 'Please upload a valid Excel file (.xlsx or .xls)')
             return render(request, 'dept_admin/bulk_create_students.html')
+        
+        # Store the upload and process it in the background
+        job = StudentImportJob.objects.create(
+            file=file,
+            department=None,  # None for department since superuser
+            created_by=request.user,
+        )
+        submit_import_job(job)
+        logger.info(f"Queued student import job {job.id} for file: {file.name}")
+        messages.info(request, f'Upload received. Student accounts are being created in the background (job #{job.id}).')
+        return redirect(f"{reverse('dept_admin:bulk_create_students')}?job={job.id}")
     
-    return render(request, 'dept_admin/bulk_create_students.html')
+    job = None
+    job_id = request.GET.get('job')
+    if job_id and job_id.isdigit():
+        job = StudentImportJob.objects.filter(pk=job_id).first()
+    
+    return render(request, 'dept_admin/bulk_create_students.html', {'job': job})
+
+@login_required
+@user_passes_test(is_superuser)
+def student_import_progress(request, job_id):
+    """JSON progress of a background student import, polled by the upload page."""
+    job = get_object_or_404(StudentImportJob, pk=job_id)
+    return JsonResponse(job.progress())
 
 @login_required
 @user_passes_test(is_superuser)
@@ -774,13 +767,13 @@ def download_template(request):
 @user_passes_test(is_dept_admin)
 def general_escalated_tickets(request):
     """View for managing all escalated tickets in the General department"""
-    if request.user.profile.department.name != 'General':
+    if request.department.name != 'General':
         messages.error(request, 'You do not have permission to view escalated tickets.')
         return redirect('dept_admin:dashboard')
     
     # Debug information
     print(f"User: {request.user.username}")
-    print(f"User department: {request.user.profile.department.name}")
+    print(f"User department: {request.department.name}")
     
     # Get all escalated tickets in the General department
     # Include both escalated status and any tickets that are in General department
@@ -788,28 +781,30 @@ def general_escalated_tickets(request):
         department__name='General'
     ).select_related(
         'student',
+        'department',
         'original_department',
         'escalated_by'
-    ).order_by('-escalated_at', '-created_at')
+    )
+    
+    # Calculate statistics
+    stats = TicketStats(tickets, buckets=['total', 'escalated', 'resolved', 'in_progress'])
+    
+    page = paginate(request, tickets, 'escalated_at')
+    if wants_json(request):
+        return page_json_response(page)
     
     # Debug information
-    print(f"Total tickets found: {tickets.count()}")
-    for ticket in tickets:
+    print(f"Total tickets found: {stats['total']}")
+    for ticket in page:
         print(f"Ticket: {ticket.ticket_id}, Status: {ticket.status}, Department: {ticket.department.name}")
     
-    # Calculate statistics
-    total_tickets = tickets.count()
-    pending_tickets = tickets.filter(status='escalated').count()
-    resolved_tickets = tickets.filter(status='resolved').count()
-    in_progress_tickets = tickets.filter(status='in_progress').count()
-    
     context = {
-        'tickets': tickets,
+        'tickets': page,
         'title': 'Escalated Tickets Management',
-        'total_tickets': total_tickets,
-        'pending_tickets': pending_tickets,
-        'resolved_tickets': resolved_tickets,
-        'in_progress_tickets': in_progress_tickets,
+        'total_tickets': stats['total'],
+        'pending_tickets': stats['escalated'],
+        'resolved_tickets': stats['resolved'],
+        'in_progress_tickets': stats['in_progress'],
     }
     
     return render(request, 'dept_admin/general_escalated_tickets.html', context)
@@ -822,7 +817,7 @@ def handle_escalated_ticket(request, ticket_id):
     logger.info(f"Request method: {request.method}")
     logger.info(f"User: {request.user.username}")
     
-    if not request.user.profile.is_general_admin():
+    if not (request.profile and request.profile.is_general_admin()):
         logger.warning(f"User {request.user.username} attempted to access handle_escalated_ticket but is not a general admin")
         messages.error(request, "You do not have permission to access this page.")
         return redirect('dept_admin:dashboard')
@@ -6,8 +6,12 @@ cd /Users/ram/Downloads/TAU-project-main
 # Activate virtual environment if you're using one
 # source /path/to/your/venv/bin/activate
 
-# Run the SLA checker
+# Run the SLA checker (not needed when the sla_watcher daemon is running)
 python manage.py check_sla
 
+# Update the daily rollup behind the SLA dashboards (not needed when the
+# refresh_sla_stats --loop worker is running)
+python manage.py refresh_sla_stats
+
 # Log the execution
 echo "$(date): SLA check completed" >> /Users/ram/Downloads/TAU-project-main/logs/sla_checker.log 
\ No newline at end of file
@@ -14,6 +14,18 @@ python manage.py collectstatic --noinput
 echo "Running automatic setup..."
 python auto_setup.py
 
+# Start the email outbox worker
+echo "Starting email outbox worker..."
+python manage.py process_outbox --loop &
+
+# Recover student import jobs orphaned by recycled gunicorn workers
+echo "Starting student import job worker..."
+python manage.py process_import_jobs --loop &
+
+# Keep the daily SLA rollup behind the dashboards up to date
+echo "Starting SLA rollup worker..."
+python manage.py refresh_sla_stats --loop &
+
 # Start gunicorn
 echo "Starting Gunicorn server..."
 exec gunicorn TAU.wsgi:application --bind 0.0.0.0:8080 --log-file - --access-logfile - --workers 2